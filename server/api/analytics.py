@@ -0,0 +1,102 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Max, Sum, Window
+from django.db.models.functions import Lag, TruncMonth
+
+ROLLING_WINDOWS = (7, 30)
+CENT = Decimal('0.01')
+
+
+def category_totals(rollups):
+    """
+    Expense total, count and share of all spending per category, largest first.
+    """
+    rows = list(
+        rollups.filter(category__isnull=False)
+        .values('category_id', 'category__name')
+        .annotate(total=Sum('expense_total'), count=Sum('expense_count'))
+        .order_by('-total', 'category_id')
+    )
+    grand_total = sum(row['total'] for row in rows)
+    return [
+        {'category': row['category_id'], 'category_name': row['category__name'], 'total': row['total'],
+         'count': row['count'], 'share': round(row['total'] / grand_total, 4) if grand_total else None}
+        for row in rows
+    ]
+
+
+def monthly_trends(rollups):
+    """
+    Income and expenses per month with the previous month's values (``LAG``
+    over the grouped rows) and the month-over-month change in percent.
+    """
+    month = TruncMonth('day')
+    rows = (
+        rollups.annotate(month=month)
+        .values('month')
+        .annotate(income=Sum('income_total'), expenses=Sum('expense_total'))
+        # A separate annotate() keeps the window expressions out of GROUP BY.
+        .annotate(
+            previous_income=Window(Lag(Sum('income_total')), order_by=month.asc()),
+            previous_expenses=Window(Lag(Sum('expense_total')), order_by=month.asc()),
+        )
+        .order_by('month')
+    )
+    return [
+        dict(row, net=row['income'] - row['expenses'],
+             income_change=percent_change(row['previous_income'], row['income']),
+             expenses_change=percent_change(row['previous_expenses'], row['expenses']))
+        for row in rows
+    ]
+
+
+def rolling_averages(rollups, start, end, windows=ROLLING_WINDOWS):
+    """
+    Daily expenses between ``start`` and ``end`` with the trailing average
+    over each of ``windows`` calendar days.
+
+    Days without spending count as zero. Frames over a date range are not
+    portable between SQL backends, so the daily totals are summed in SQL and
+    the moving averages taken over the dense series here.
+    """
+    history_start = start - timedelta(days=max(windows) - 1)
+    daily = dict(
+        rollups.filter(day__gte=history_start, day__lte=end)
+        .values('day')
+        .annotate(total=Sum('expense_total'))
+        .values_list('day', 'total')
+        .order_by()
+    )
+
+    totals = [daily.get(history_start + timedelta(days=offset), Decimal(0))
+              for offset in range((end - history_start).days + 1)]
+    prefix = [Decimal(0)]
+    for total in totals:
+        prefix.append(prefix[-1] + total)
+
+    series = []
+    for index in range((start - history_start).days, len(totals)):
+        row = {'day': history_start + timedelta(days=index), 'expenses': totals[index]}
+        for window in windows:
+            row[f'avg_{window}d'] = ((prefix[index + 1] - prefix[index + 1 - window]) / window).quantize(CENT)
+        series.append(row)
+    return series
+
+
+def top_merchants(expenses, limit=10):
+    """
+    Expenses grouped by description, largest total first.
+    """
+    return list(
+        expenses.values('description')
+        .annotate(total=Sum('amount'), count=Count('id'), last_date=Max('date'))
+        .order_by('-total', 'description')[:limit]
+    )
+
+
+def percent_change(previous, current):
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 2)
+
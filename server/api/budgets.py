@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.timezone import localdate
+
+from .cache import invalidate
+from .models import Budget
+
+
+def adjust_budget_totals(user, income=0, expenses=0):
+    """
+    Add to the running totals of the user's budgets in a single UPDATE.
+
+    The increment happens in the database, so concurrent requests cannot
+    overwrite each other's changes. Users without a budget are a no-op.
+    """
+    updates = {}
+    if income:
+        updates['total_income'] = F('total_income') + income
+    if expenses:
+        updates['total_expenses'] = F('total_expenses') + expenses
+    if not updates:
+        return 0
+    updated = Budget.objects.filter(user=user).update(updated_at=timezone.now(), **updates)
+    if updated:
+        invalidate('budgets', user.pk)
+    return updated
+
+
+def period_start(period, today):
+    """
+    First day of the budget period containing ``today``. Weeks start on Monday.
+    """
+    if period == 'weekly':
+        return today - timedelta(days=today.weekday())
+    if period == 'monthly':
+        return today.replace(day=1)
+    return today
+
+
+def period_end(period, today):
+    """
+    Last day of the budget period containing ``today``.
+    """
+    if period == 'weekly':
+        return period_start(period, today) + timedelta(days=6)
+    if period == 'monthly':
+        next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+    return today
+
+
+def reset_stale_budgets(today=None):
+    """
+    Zero the totals of every budget whose period has rolled over since its
+    last reset, with one UPDATE per period type.
+
+    Returns the number of budgets reset for each period.
+    """
+    today = today or localdate()
+    now = timezone.now()
+    reset = {}
+    for period, _ in Budget._meta.get_field('period').choices:
+        reset[period] = Budget.objects.filter(
+            period=period, last_reset_date__lt=period_start(period, today)
+        ).update(total_income=0, total_expenses=0, last_reset_date=today, updated_at=now)
+    if any(reset.values()):
+        invalidate('budgets')
+    return reset
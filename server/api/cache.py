@@ -0,0 +1,102 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def response_cache():
+    return caches[getattr(settings, 'API_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version(cache, key):
+    """
+    Current version token for ``key``. Tokens are random rather than counters,
+    so an evicted version can never bring back responses cached under it.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def response_cache_key(scope, user_id, path):
+    cache = response_cache()
+    scope_version = _version(cache, f'api:version:{scope}')
+    user_version = _version(cache, f'api:version:{scope}:{user_id}')
+    digest = hashlib.md5(path.encode('utf-8')).hexdigest()
+    return f'api:response:{scope}:{scope_version}:{user_id}:{user_version}:{digest}'
+
+
+def invalidate(scope, user_id=None):
+    """
+    Drop cached responses of ``scope`` for one user (or group, for group
+    scopes), or for everyone when ``user_id`` is None (used after bulk updates).
+    """
+    key = f'api:version:{scope}' if user_id is None else f'api:version:{scope}:{user_id}'
+    response_cache().set(key, uuid.uuid4().hex, None)
+
+
+def get_or_compute(scope, owner_id, name, compute):
+    """
+    Cached result of ``compute()`` for one owner (a user or a group id) of
+    ``scope``, dropped together with the scope by ``invalidate``.
+    """
+    cache = response_cache()
+    key = response_cache_key(scope, owner_id, name)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', 300))
+    return value
+
+
+class CachedResponseMixin:
+    """
+    Caches ``list``/``retrieve`` responses per user and URL for viewsets whose
+    data changes rarely, and answers ``If-None-Match`` with 304.
+
+    Entries are invalidated by bumping the ``cache_scope`` version from model
+    signals (see ``api/signals.py``) or explicitly after bulk updates.
+    """
+    cache_scope = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        cache = response_cache()
+        key = response_cache_key(self.cache_scope, request.user.pk, request.get_full_path())
+        cached = cache.get(key)
+        if cached is not None:
+            etag, data = cached
+            response = Response(data)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = json.dumps(response.data, cls=JSONEncoder, sort_keys=True)
+            etag = quote_etag(hashlib.md5(body.encode('utf-8')).hexdigest())
+            cache.set(key, (etag, response.data), getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', 300))
+
+        # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+        client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+        if etag in client_etags or '*' in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,99 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import get_channel_layer
+
+from .models import GroupChat, GroupMember
+from .views.main.serializer import GroupChatMessageSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def chat_group_name(group_chat_id):
+    return f'group_chat_{group_chat_id}'
+
+
+def broadcast_chat_message(group_chat_id, message):
+    """
+    Push a serialized message to every socket connected to the chat.
+    Used by the REST endpoint so polling and socket clients stay in sync.
+
+    The message is already stored, so a channel layer that is down (e.g.
+    Redis unreachable) is logged instead of failing the request; polling
+    clients still pick the message up.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            chat_group_name(group_chat_id),
+            {'type': 'chat.message', 'message': message},
+        )
+    except Exception:
+        logger.exception("broadcast_chat_message: push to chat %s failed", group_chat_id)
+
+
+class GroupChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Real-time feed for a group's chat.
+
+    Connect to ``ws/groupchats/<group_id>/chat/?token=<access token>``. Only
+    group members are accepted. New messages are pushed as they are posted,
+    and clients may post by sending ``{"message": "..."}``.
+    """
+
+    async def connect(self):
+        self.chat_group_name = None
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        group_id = self.scope['url_route']['kwargs']['group_id']
+        self.group_chat = await self.get_group_chat(group_id, user)
+        if self.group_chat is None:
+            await self.close(code=4403)
+            return
+
+        self.chat_group_name = chat_group_name(self.group_chat.id)
+        await self.channel_layer.group_add(self.chat_group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.chat_group_name:
+            await self.channel_layer.group_discard(self.chat_group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        message, errors = await self.save_message(content)
+        if errors:
+            await self.send_json({'errors': errors})
+            return
+        await self.channel_layer.group_send(
+            self.chat_group_name,
+            {'type': 'chat.message', 'message': message},
+        )
+
+    async def chat_message(self, event):
+        await self.send_json(event['message'])
+
+    @database_sync_to_async
+    def get_group_chat(self, group_id, user):
+        if not GroupMember.objects.filter(group_id=group_id, user=user).exists():
+            return None
+        return GroupChat.objects.filter(group_id=group_id).first()
+
+    @database_sync_to_async
+    def save_message(self, content):
+        user = self.scope['user']
+        # Membership is checked again in case the user was removed while connected.
+        if not GroupMember.objects.filter(group_id=self.group_chat.group_id, user=user).exists():
+            return None, {'detail': 'User is not a member of the group.'}
+
+        serializer = GroupChatMessageSerializer(data=content)
+        if not serializer.is_valid():
+            return None, serializer.errors
+        serializer.save(group_chat=self.group_chat, user=user)
+        return dict(serializer.data), None
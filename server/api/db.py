@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def database_status(alias='default'):
+    """
+    Round-trip latency, connection reuse settings and, when available, pool
+    usage of a database connection.
+    """
+    connection = connections[alias]
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    status = {
+        'alias': alias,
+        'vendor': connection.vendor,
+        'profile': getattr(settings, 'DB_PROFILE', None),
+        'latency_ms': round((time.perf_counter() - started) * 1000, 3),
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'pool': None,
+    }
+
+    pool = getattr(connection, 'pool', None)
+    if pool is not None:
+        status['pool'] = pool.get_stats()
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            status['sqlite'] = {
+                pragma: cursor.execute(f'PRAGMA {pragma}').fetchone()[0]
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout')
+            }
+    return status
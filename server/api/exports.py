@@ -0,0 +1,65 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Expense, FinancialGoalContribution, GroupExpenseContribution, Income
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+EXPORT_COLUMNS = ['record_type', 'id', 'date', 'amount', 'description', 'category', 'source', 'goal', 'group', 'group_expense']
+
+
+class Echo:
+    """
+    File-like object whose ``write`` hands the value back, so ``csv.writer``
+    can produce one line at a time for a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def ledger_records(user, date_from=None, date_to=None, chunk_size=2000):
+    """
+    Yield every ledger record of a user as a flat dict, reading each table
+    with a server-side iterator so memory use stays constant.
+    """
+    def dated(queryset, field):
+        if date_from:
+            queryset = queryset.filter(**{f'{field}__gte': date_from})
+        if date_to:
+            queryset = queryset.filter(**{f'{field}__lte': date_to})
+        return queryset
+
+    incomes = dated(Income.objects.filter(user=user), 'date').order_by('date', 'id')
+    for row in incomes.values('id', 'date', 'amount', 'description', 'source__source_name').iterator(chunk_size=chunk_size):
+        yield {'record_type': 'income', 'id': row['id'], 'date': row['date'], 'amount': row['amount'],
+               'description': row['description'], 'source': row['source__source_name']}
+
+    expenses = dated(Expense.objects.filter(user=user), 'date').order_by('date', 'id')
+    for row in expenses.values('id', 'date', 'amount', 'description', 'category__name').iterator(chunk_size=chunk_size):
+        yield {'record_type': 'expense', 'id': row['id'], 'date': row['date'], 'amount': row['amount'],
+               'description': row['description'], 'category': row['category__name']}
+
+    goal_contributions = dated(FinancialGoalContribution.objects.filter(user=user), 'date__date').order_by('date', 'id')
+    for row in goal_contributions.values('id', 'date', 'amount', 'goal__name').iterator(chunk_size=chunk_size):
+        yield {'record_type': 'goal_contribution', 'id': row['id'], 'date': row['date'], 'amount': row['amount'],
+               'goal': row['goal__name']}
+
+    group_contributions = dated(GroupExpenseContribution.objects.filter(user=user), 'date__date').order_by('date', 'id')
+    for row in group_contributions.values('id', 'date', 'amount', 'group_expense__title', 'group_expense__group__name').iterator(chunk_size=chunk_size):
+        yield {'record_type': 'group_contribution', 'id': row['id'], 'date': row['date'], 'amount': row['amount'],
+               'group': row['group_expense__group__name'], 'group_expense': row['group_expense__title']}
+
+
+def stream_csv(records):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for record in records:
+        yield writer.writerow([record.get(column, '') for column in EXPORT_COLUMNS])
+
+
+def stream_jsonl(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
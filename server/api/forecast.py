@@ -0,0 +1,138 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .budgets import period_end, period_start
+from .models import Budget, SpendingForecast, SpendingRollup
+
+# Days of history the model is fitted on; a whole number of weeks keeps every
+# weekday equally represented.
+HISTORY_DAYS = 91
+SMOOTHING = 0.3
+
+
+def load_history(user_ids, start, end):
+    """
+    Daily expenses per (user, category) from the rollups as ``(keys, matrix)``,
+    one matrix row per key and one column per day from ``start`` to ``end``.
+    """
+    rows = (
+        SpendingRollup.objects.filter(user_id__in=user_ids, category__isnull=False, day__gte=start, day__lte=end)
+        .values_list('user_id', 'category_id', 'day', 'expense_total')
+    )
+    keys, index, cells, days, amounts = [], {}, [], [], []
+    for user_id, category_id, day, total in rows:
+        key = (user_id, category_id)
+        if key not in index:
+            index[key] = len(keys)
+            keys.append(key)
+        cells.append(index[key])
+        days.append((day - start).days)
+        amounts.append(float(total))
+
+    matrix = np.zeros((len(keys), (end - start).days + 1))
+    np.add.at(matrix, (np.array(cells, dtype=int), np.array(days, dtype=int)), np.array(amounts))
+    return keys, matrix
+
+
+def fit(history, start, alpha=SMOOTHING):
+    """
+    Fit every row of ``history`` (first column is ``start``) at once.
+
+    Returns the exponentially smoothed, weekday-adjusted daily level with
+    shape ``(rows,)`` and the weekday factors with shape ``(rows, 7)``, where
+    a factor of 1 means a typical day and 0 a weekday without spending.
+    """
+    weekdays = (start.weekday() + np.arange(history.shape[1])) % 7
+    one_hot = np.eye(7)[weekdays]
+    weekday_means = (history @ one_hot) / np.maximum(one_hot.sum(axis=0), 1)
+    overall = history.mean(axis=1, keepdims=True)
+    factors = np.divide(weekday_means, overall, out=np.ones_like(weekday_means), where=overall > 0)
+
+    seasonal = factors[:, weekdays]
+    observed = seasonal > 0
+    adjusted = np.divide(history, seasonal, out=np.zeros_like(history), where=observed)
+    level = overall[:, 0].copy()
+    for day in range(history.shape[1]):
+        # Weekdays that never see spending carry no information about the level.
+        level = np.where(observed[:, day], alpha * adjusted[:, day] + (1 - alpha) * level, level)
+    return level, factors
+
+
+def project(level, factors, start, end):
+    """
+    Expected spending of every row over ``start`` to ``end`` inclusive.
+    """
+    days = max((end - start).days + 1, 0)
+    counts = np.bincount((start.weekday() + np.arange(days)) % 7, minlength=7)
+    return level * (factors @ counts)
+
+
+def build_forecasts(user_ids, as_of):
+    """
+    Unsaved forecasts for the users' budgets (over each budget's current
+    period) and categories (over the current month), fitted on the days
+    before ``as_of``.
+    """
+    history_start = as_of - timedelta(days=HISTORY_DAYS)
+    keys, history = load_history(user_ids, history_start, as_of - timedelta(days=1))
+
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    user_history = np.zeros((len(user_ids), history.shape[1]))
+    np.add.at(user_history, np.array([user_index[user_id] for user_id, _ in keys], dtype=int), history)
+
+    def forecast(matrix, period):
+        level, factors = fit(matrix, history_start)
+        start, end = period_start(period, as_of), period_end(period, as_of)
+        spent = matrix[:, (start - history_start).days:].sum(axis=1)
+        return start, end, spent, spent + project(level, factors, as_of, end), level
+
+    forecasts = []
+    start, end, spent, projected, level = forecast(history, 'monthly')
+    for i, (user_id, category_id) in enumerate(keys):
+        forecasts.append(SpendingForecast(
+            user_id=user_id, category_id=category_id, period_start=start, period_end=end, generated_on=as_of,
+            spent=money(spent[i]), projected_total=money(projected[i]), daily_rate=money(level[i]),
+        ))
+
+    budgets = Budget.objects.filter(user_id__in=user_ids).values_list('id', 'user_id', 'period')
+    by_period = {}
+    for budget_id, user_id, period in budgets:
+        by_period.setdefault(period, []).append((budget_id, user_index[user_id]))
+    for period, rows in by_period.items():
+        start, end, spent, projected, level = forecast(user_history, period)
+        for budget_id, i in rows:
+            forecasts.append(SpendingForecast(
+                user_id=user_ids[i], budget_id=budget_id, period_start=start, period_end=end, generated_on=as_of,
+                spent=money(spent[i]), projected_total=money(projected[i]), daily_rate=money(level[i]),
+            ))
+    return forecasts
+
+
+def refresh_forecasts(as_of, chunk_size=1000):
+    """
+    Replace the stored forecasts of every user, ``chunk_size`` users at a
+    time. Returns the number of users and forecasts written.
+    """
+    metrics = {'users': 0, 'forecasts': 0}
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    while True:
+        user_ids = list(users.filter(pk__gt=last_pk)[:chunk_size])
+        if not user_ids:
+            break
+        last_pk = user_ids[-1]
+        forecasts = build_forecasts(user_ids, as_of)
+        with transaction.atomic():
+            SpendingForecast.objects.filter(user_id__in=user_ids).delete()
+            SpendingForecast.objects.bulk_create(forecasts, batch_size=1000)
+        metrics['users'] += len(user_ids)
+        metrics['forecasts'] += len(forecasts)
+    return metrics
+
+
+def money(value):
+    return Decimal(f'{value:.2f}')
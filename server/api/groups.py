@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .cache import invalidate
+from .models import GroupExpense, GroupExpenseContribution
+
+
+CENT = Decimal('0.01')
+
+
+def split_amount(total, weights):
+    """
+    ``total`` split in proportion to integer ``weights``, in whole cents that
+    add up to ``total`` exactly; left-over cents go to the first entries.
+    """
+    cents = int(total / CENT)
+    weight_sum = sum(weights)
+    shares = [cents * weight // weight_sum for weight in weights]
+    for index in range(cents - sum(shares)):
+        shares[index] += 1
+    return [share * CENT for share in shares]
+
+
+def add_contributions(group_expense, contributions):
+    """
+    Insert unsaved ``contributions`` to ``group_expense`` and add them to its
+    running ``contributed_total`` and ``contributor_count``.
+
+    The expense row is locked while earlier contributors are looked up, so
+    concurrent requests cannot count the same new contributor twice. Returns
+    the created contributions.
+    """
+    with transaction.atomic():
+        GroupExpense.objects.select_for_update().get(pk=group_expense.pk)
+        user_ids = {contribution.user_id for contribution in contributions}
+        earlier = set(
+            GroupExpenseContribution.objects.filter(group_expense=group_expense, user_id__in=user_ids)
+            .values_list('user_id', flat=True)
+        )
+        for contribution in contributions:
+            contribution.group_expense = group_expense
+        created = GroupExpenseContribution.objects.bulk_create(contributions)
+
+        total = sum((contribution.amount for contribution in contributions), Decimal('0.00'))
+        GroupExpense.objects.filter(pk=group_expense.pk).update(
+            contributed_total=F('contributed_total') + total,
+            contributor_count=F('contributor_count') + len(user_ids - earlier),
+        )
+    group_expense.refresh_from_db(fields=['contributed_total', 'contributor_count'])
+    # bulk_create skips the signal that drops the cached settlement.
+    invalidate('settlement', group_expense.group_id)
+    return created
+
+
+def repair_contribution_totals(group_ids=None):
+    """
+    Recompute every expense's running totals from its contributions in one
+    UPDATE, for all groups or only ``group_ids``. Returns the rows updated.
+    """
+    contributions = GroupExpenseContribution.objects.filter(group_expense=OuterRef('pk')).order_by().values('group_expense')
+    expenses = GroupExpense.objects.all()
+    if group_ids is not None:
+        expenses = expenses.filter(group_id__in=group_ids)
+    return expenses.update(
+        contributed_total=Coalesce(
+            Subquery(contributions.annotate(total=Sum('amount')).values('total')),
+            Value(Decimal('0.00')), output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        contributor_count=Coalesce(
+            Subquery(contributions.annotate(count=Count('user', distinct=True)).values('count')), Value(0),
+        ),
+    )
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils.timezone import localdate
+
+from .budgets import adjust_budget_totals
+from .cache import invalidate
+from .models import Category, Expense, Income, IncomeSource
+from .rollups import apply_deltas, rollup_key
+from .views.main.serializer import ExpenseImportSerializer, IncomeImportSerializer
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+IMPORT_SERIALIZERS = {
+    'income': IncomeImportSerializer,
+    'expense': ExpenseImportSerializer,
+}
+
+
+def iter_rows(upload, file_format):
+    """
+    Yield ``(line_number, row)`` from a binary CSV or JSON-lines file object,
+    reading it incrementally. Malformed JSON lines yield a ``None`` row.
+    """
+    stream = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='' if file_format == 'csv' else None)
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+class LedgerImporter:
+    """
+    Imports incomes and expenses for one user in chunks.
+
+    Each chunk is validated with the income/expense import serializers,
+    category and source names are resolved through an in-memory map (unknown
+    names are created in bulk), rows are inserted with ``bulk_create`` and the
+    spending rollups and budget totals are updated once per chunk.
+    """
+    chunk_size = 500
+    max_errors = 100
+
+    def __init__(self, user, default_type=None):
+        self.user = user
+        self.default_type = default_type
+        self.categories = {}
+        self.sources = {}
+        for category_id, name in Category.objects.filter(user=user).order_by('-id').values_list('id', 'name'):
+            self.categories[name] = category_id
+        for source_id, name in IncomeSource.objects.filter(user=user).order_by('-id').values_list('id', 'source_name'):
+            self.sources[name] = source_id
+        self.created = {'income': 0, 'expense': 0}
+        self.errors = []
+        self.error_count = 0
+
+    def run(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return {'created': self.created, 'error_count': self.error_count, 'errors': self.errors}
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def import_chunk(self, rows):
+        valid = {'income': [], 'expense': []}
+        for line, row in rows:
+            if row is None:
+                self.add_error(line, {'non_field_errors': ['Row is not a JSON object.']})
+                continue
+            kind = row.get('type') or self.default_type or ''
+            # JSON lines can carry any type here, not only strings.
+            kind = kind.strip().lower() if isinstance(kind, str) else None
+            serializer_class = IMPORT_SERIALIZERS.get(kind)
+            if serializer_class is None:
+                self.add_error(line, {'type': ["Must be 'income' or 'expense'."]})
+                continue
+            serializer = serializer_class(data=row)
+            if not serializer.is_valid():
+                self.add_error(line, serializer.errors)
+                continue
+            valid[kind].append(serializer.validated_data)
+
+        with transaction.atomic():
+            self.resolve_names(valid)
+            incomes = Income.objects.bulk_create([
+                Income(user=self.user, source_id=self.sources[data['source']], amount=data['amount'],
+                       description=data['description'], date=data['date'])
+                for data in valid['income']
+            ])
+            expenses = Expense.objects.bulk_create([
+                Expense(user=self.user, category_id=self.categories[data['category']], amount=data['amount'],
+                        description=data['description'], date=data['date'])
+                for data in valid['expense']
+            ])
+            self.update_totals(incomes, expenses)
+
+        self.created['income'] += len(incomes)
+        self.created['expense'] += len(expenses)
+
+    def resolve_names(self, valid):
+        new_sources = {data['source'] for data in valid['income']} - self.sources.keys()
+        for source in IncomeSource.objects.bulk_create([IncomeSource(user=self.user, source_name=name) for name in new_sources]):
+            self.sources[source.source_name] = source.id
+        if new_sources:
+            invalidate('source', self.user.pk)
+
+        new_categories = {data['category'] for data in valid['expense']} - self.categories.keys()
+        for category in Category.objects.bulk_create([Category(user=self.user, name=name) for name in new_categories]):
+            self.categories[category.name] = category.id
+        if new_categories:
+            invalidate('category', self.user.pk)
+
+    def update_totals(self, incomes, expenses):
+        # bulk_create skips the ledger signals, so rollups and budgets are
+        # brought up to date here, once for the whole chunk.
+        deltas = defaultdict(lambda: (Decimal('0.00'), 0))
+        for entry in [*incomes, *expenses]:
+            key = rollup_key(entry.__dict__)
+            amount, count = deltas[key]
+            deltas[key] = (amount + entry.amount, count + 1)
+        apply_deltas(deltas)
+
+        today = localdate()
+        adjust_budget_totals(
+            self.user,
+            income=sum((income.amount for income in incomes), Decimal('0.00')),
+            expenses=sum((expense.amount for expense in expenses if expense.date == today), Decimal('0.00')),
+        )
@@ -0,0 +1,91 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.models import (
+    BillReminder, Category, Expense, FinancialGoalContribution, FinancialGoals, GroupChatMessage, Income,
+    IncomeSource,
+)
+from api.seed import seed_ledger
+
+INDEXED_MODELS = [Income, Expense, Category, IncomeSource, BillReminder, GroupChatMessage, FinancialGoalContribution]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and report EXPLAIN plans and timings of "
+        "the per-user ledger queries with and without the composite indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--rows', type=int, default=2000, help="Ledger rows per user.")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', dest='json_path', help="Also write the report to this file.")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+    def run(self, options):
+        self.stdout.write(f"Seeding {options['users']} users x {options['rows']} rows...")
+        users = seed_ledger(users=options['users'], rows_per_user=options['rows'], seed=options['seed'])
+        queries = self.queries(users[len(users) // 2])
+
+        report = {'vendor': connection.vendor, 'users': options['users'], 'rows_per_user': options['rows'], 'queries': {}}
+        for phase in ('without_indexes', 'with_indexes'):
+            if phase == 'without_indexes':
+                self.alter_indexes('remove_sql')
+            else:
+                self.alter_indexes('create_sql')
+            self.analyze()
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {phase.replace('_', ' ')} =="))
+            for name, queryset in queries.items():
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    list(queryset.all())
+                    timings.append((time.perf_counter() - started) * 1000)
+                plan = queryset.explain()
+                median = statistics.median(timings)
+                report['queries'].setdefault(name, {})[phase] = {'median_ms': round(median, 3), 'plan': plan}
+                self.stdout.write(f"{name}: {median:.3f} ms\n    " + plan.replace('\n', '\n    '))
+        return report
+
+    def queries(self, user):
+        goal = FinancialGoals.objects.filter(user=user).first()
+        chat_id = GroupChatMessage.objects.values_list('group_chat_id', flat=True).first()
+        return {
+            'income_by_created': Income.objects.filter(user=user).order_by('created_at', 'id')[:50],
+            'income_by_date_range': Income.objects.filter(user=user, date__gte='2000-01-01').order_by('date', 'id'),
+            'expense_by_created': Expense.objects.filter(user=user).order_by('created_at', 'id')[:50],
+            'expense_by_date_range': Expense.objects.filter(user=user, date__gte='2000-01-01').order_by('date', 'id'),
+            'category_by_name': Category.objects.filter(user=user, name='Goals'),
+            'source_by_name': IncomeSource.objects.filter(user=user, source_name='Salary'),
+            'unpaid_bills': BillReminder.objects.filter(user=user, is_paid=False).order_by('due_date'),
+            'chat_latest_page': GroupChatMessage.objects.filter(group_chat_id=chat_id).order_by('-created_at')[:50],
+            'goal_contributions': FinancialGoalContribution.objects.filter(goal=goal).order_by('date'),
+            'user_goal_contributions': FinancialGoalContribution.objects.filter(user=user).order_by('date'),
+        }
+
+    def alter_indexes(self, method):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.execute(getattr(index, method)(model, editor))
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
@@ -0,0 +1,242 @@
+import json
+import statistics
+import time
+from itertools import count
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils.timezone import localdate
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api import urls as api_urls
+from api.models import (
+    BillReminder, Budget, Category, Expense, FinancialGoals, Group, GroupExpense, GroupMember, Income, IncomeSource,
+)
+from api.seed import seed_ledger
+
+PASSWORD = 'benchmark-Pa55word'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and time every route in api/urls.py with "
+        "the test client, reporting latency percentiles and query counts as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--rows', type=int, default=500, help="Ledger rows per user.")
+        parser.add_argument('--repeat', type=int, default=30, help="Timed requests per route.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--route', action='append', dest='routes', help="Only run this route name (repeatable).")
+        parser.add_argument('--output', help="Write the report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError("--repeat must be at least 2 to compute percentiles.")
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        # Sorted keys keep reports from different commits diffable.
+        text = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(text + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(report['routes'])} routes to {options['output']}."))
+        else:
+            self.stdout.write(text)
+
+    def run(self, options):
+        self.stderr.write(f"Seeding {options['users']} users x {options['rows']} rows...")
+        users = seed_ledger(users=options['users'], rows_per_user=options['rows'], seed=options['seed'])
+        user, other = users[0], users[1]
+        for member in (user, other):
+            member.set_password(PASSWORD)
+            member.save(update_fields=['password'])
+
+        scenarios = self.scenarios(user, other)
+        names = route_names(api_urls.urlpatterns)
+        report = {
+            'settings': {key: options[key] for key in ('users', 'rows', 'repeat', 'seed')},
+            'vendor': connection.vendor,
+            'routes': {},
+            'uncovered': sorted(names - {scenario[0] for scenario in scenarios}),
+        }
+
+        for name, method, path, data, client in scenarios:
+            if options['routes'] and name not in options['routes']:
+                continue
+            key = f'{method} {name}'
+            report['routes'][key] = result = self.measure(client, method, path, data, options['repeat'])
+            self.stderr.write(
+                f"{key:45} p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  {result['queries']:3d} queries"
+            )
+        return report
+
+    def scenarios(self, user, other):
+        """
+        ``(url name, method, path, data, client)`` for every benchmarked route.
+        ``data`` may be a callable taking the run number, for requests that
+        need fresh input each time; it is called outside the timed section.
+        """
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        other_client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(other)}')
+        anonymous = Client()
+
+        group = Group.objects.filter(admin=user).first()
+        group_expense = GroupExpense.objects.filter(group=group).first()
+        goal = FinancialGoals.objects.filter(user=user).first()
+        bill = BillReminder.objects.filter(user=user).first()
+        # mark_paid only accepts bills due in the current month.
+        bill.due_date = localdate()
+        bill.save(update_fields=['due_date'])
+        source = IncomeSource.objects.filter(user=user).first()
+        category = Category.objects.filter(user=user).first()
+        serial = count()
+
+        def detail(name, obj):
+            return reverse(name, kwargs={'pk': obj.pk})
+
+        def refresh(i):
+            return {'refresh': str(RefreshToken.for_user(user))}
+
+        def register(i):
+            username = f'benchmark-{next(serial)}'
+            return {'username': username, 'email': f'{username}@example.com', 'password': PASSWORD, 'password2': PASSWORD}
+
+        def change_password(i):
+            passwords = [PASSWORD, PASSWORD[::-1]]
+            return {'old_password': passwords[i % 2], 'new_password': passwords[(i + 1) % 2]}
+
+        def ledger_file(i):
+            rows = ''.join(f'expense,{n + 1}.00,Import {n},2024-01-{n % 28 + 1:02d},Imported\n' for n in range(50))
+            upload = SimpleUploadedFile('ledger.csv', ('type,amount,description,date,category\n' + rows).encode())
+            return {'file': upload}
+
+        def new_member(i):
+            member = User.objects.create_user(username=f'benchmark-member-{next(serial)}')
+            return {'username': member.username}
+
+        def leaving_member(i):
+            member = User.objects.create_user(username=f'benchmark-leaver-{next(serial)}')
+            GroupMember.objects.create(group=group, user=member)
+            return reverse('group-delete-member', kwargs={'pk': group.pk, 'username': member.username})
+
+        return [
+            # Authentication
+            ('register', 'POST', reverse('register'), register, anonymous),
+            ('login', 'POST', reverse('login'), {'username': user.username, 'password': PASSWORD}, anonymous),
+            ('token_refresh', 'POST', reverse('token_refresh'), refresh, anonymous),
+            ('logout', 'POST', reverse('logout'), refresh, client),
+            ('password_change', 'PUT', reverse('password_change'), change_password, other_client),
+
+            # Ledger
+            ('api-root', 'GET', reverse('api-root'), None, client),
+            ('source-list', 'GET', reverse('source-list'), None, client),
+            ('source-detail', 'GET', detail('source-detail', source), None, client),
+            ('income-list', 'GET', reverse('income-list'), None, client),
+            ('income-list', 'POST', reverse('income-list'),
+             {'source': source.pk, 'amount': '100.00', 'description': 'Benchmark', 'date': '2024-01-01'}, client),
+            ('income-detail', 'GET', detail('income-detail', Income.objects.filter(user=user).first()), None, client),
+            ('catagory-list', 'GET', reverse('catagory-list'), None, client),
+            ('catagory-detail', 'GET', detail('catagory-detail', category), None, client),
+            ('expense-list', 'GET', reverse('expense-list'), None, client),
+            ('expense-list', 'POST', reverse('expense-list'),
+             {'category': category.pk, 'amount': '10.00', 'description': 'Benchmark', 'date': '2024-01-01'}, client),
+            ('expense-detail', 'GET', detail('expense-detail', Expense.objects.filter(user=user).first()), None, client),
+            ('transactions', 'GET', reverse('transactions'), None, client),
+            ('spending-summary', 'GET', reverse('spending-summary'), None, client),
+            ('analytics', 'GET', reverse('analytics'), None, client),
+            ('spending-forecast', 'GET', reverse('spending-forecast'), None, client),
+            ('ledger-import', 'POST', reverse('ledger-import'), ledger_file, client),
+            ('ledger-export', 'GET', reverse('ledger-export'), None, client),
+
+            # Goals, budgets and bills
+            ('goals-list', 'GET', reverse('goals-list'), None, client),
+            ('goals-detail', 'GET', detail('goals-detail', goal), None, client),
+            ('manual-contribution', 'POST', reverse('manual-contribution'), {'goal_id': goal.pk, 'amount': '5.00'}, client),
+            ('budget-list', 'GET', reverse('budget-list'), None, client),
+            ('budget-detail', 'GET', detail('budget-detail', Budget.objects.filter(user=user).first()), None, client),
+            ('billreminder-list', 'GET', reverse('billreminder-list'), None, client),
+            ('billreminder-detail', 'GET', detail('billreminder-detail', bill), None, client),
+            ('billreminder-mark-paid', 'PATCH', detail('billreminder-mark-paid', bill), {}, client),
+
+            # Groups
+            ('group-list', 'GET', reverse('group-list'), None, client),
+            ('group-detail', 'GET', detail('group-detail', group), None, client),
+            ('group-settlement', 'GET', detail('group-settlement', group), None, client),
+            ('group-add-member', 'POST', detail('group-add-member', group), new_member, client),
+            ('group-delete-member', 'DELETE', leaving_member, None, client),
+            ('groupexpense-list', 'GET', reverse('groupexpense-list'), None, client),
+            ('groupexpense-detail', 'GET', detail('groupexpense-detail', group_expense), None, client),
+            ('groupexpense-add-contribution', 'POST', detail('groupexpense-add-contribution', group_expense),
+             {'expense_id': group_expense.pk, 'group_id': group.pk, 'amount': '1.00'}, client),
+            ('groupexpense-batch-contributions', 'POST', detail('groupexpense-batch-contributions', group_expense),
+             {'split': 'equal'}, client),
+            ('group-chat', 'GET', reverse('group-chat', kwargs={'group_id': group.pk}), None, client),
+            ('group-chat', 'POST', reverse('group-chat', kwargs={'group_id': group.pk}), {'message': 'Benchmark'}, client),
+
+            # Operations
+            ('health-db', 'GET', reverse('health-db'), None, anonymous),
+        ]
+
+    def measure(self, client, method, path, data, repeat):
+        """
+        Run one untimed warm-up request, then ``repeat`` timed ones.
+        """
+        timings, queries, statuses = [], [], set()
+        for i in range(repeat + 1):
+            url = path(i) if callable(path) else path
+            payload = data(i) if callable(data) else data
+            kwargs = {}
+            if payload is not None:
+                kwargs['data'] = payload
+                if not any(hasattr(value, 'read') for value in payload.values()):
+                    kwargs['content_type'] = 'application/json'
+
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, method.lower())(url, **kwargs)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+
+            statuses.add(response.status_code)
+            if i == 0:
+                first_url, first_queries = url, len(context.captured_queries)
+                continue
+            timings.append(elapsed)
+            queries.append(len(context.captured_queries))
+
+        cuts = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'path': first_url,
+            'status': sorted(statuses),
+            'p50_ms': round(cuts[49], 3),
+            'p90_ms': round(cuts[89], 3),
+            'p99_ms': round(cuts[98], 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries_first': first_queries,
+            'queries': max(queries),
+        }
+
+
+def route_names(patterns):
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
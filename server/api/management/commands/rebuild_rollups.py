@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute SpendingRollup rows from the Income and Expense tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help="Only rebuild this user id (repeatable).")
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows."))
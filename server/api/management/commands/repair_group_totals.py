@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.groups import repair_contribution_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute GroupExpense contribution totals and contributor counts from the contributions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', type=int, action='append', dest='group_ids',
+                            help="Only repair this group id (repeatable).")
+
+    def handle(self, *args, **options):
+        count = repair_contribution_totals(options['group_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Repaired {count} group expenses."))
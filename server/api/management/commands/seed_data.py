@@ -0,0 +1,29 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.seed import seed_ledger
+
+
+class Command(BaseCommand):
+    help = "Seed the configured database with synthetic users, ledgers, groups, chats and bills."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--rows', type=int, default=1000, help="Ledger rows per user.")
+        parser.add_argument('--days', type=int, default=365, help="Spread rows over this many past days.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; also prefixes the usernames.")
+        parser.add_argument('--password', help="Give every seeded user this password so they can log in.")
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=f"seed-{options['seed']}-").exists():
+            raise CommandError(f"Users for seed {options['seed']} already exist; pick another --seed.")
+
+        users = seed_ledger(users=options['users'], rows_per_user=options['rows'], seed=options['seed'], days=options['days'])
+        if options['password']:
+            # Hash once; every seeded user shares the same credentials.
+            User.objects.filter(id__in=[user.id for user in users]).update(password=make_password(options['password']))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users ({users[0].username} .. {users[-1].username}) with {options['rows']} ledger rows each."
+        ))
@@ -0,0 +1,86 @@
+import threading
+from collections import defaultdict
+
+# Upper bounds of the histogram buckets; +Inf is implied.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """
+    In-process request metrics rendered in the Prometheus text format.
+
+    Each worker process keeps its own registry, so scrape every worker (or
+    aggregate by instance) when running more than one.
+    """
+    histograms = {
+        'http_request_duration_seconds': ('Wall time spent handling the request.', DURATION_BUCKETS),
+        'http_request_db_queries': ('SQL queries executed per request.', QUERY_COUNT_BUCKETS),
+        'http_request_db_duration_seconds': ('Time spent in SQL per request.', DURATION_BUCKETS),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = defaultdict(int)
+            self.observations = {
+                name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+                for name, (_, buckets) in self.histograms.items()
+            }
+
+    def observe_request(self, route, method, status_code, duration, query_count, query_duration):
+        labels = (route, method)
+        with self.lock:
+            self.requests[(route, method, str(status_code))] += 1
+            self.observations['http_request_duration_seconds'][labels].observe(duration)
+            self.observations['http_request_db_queries'][labels].observe(query_count)
+            self.observations['http_request_db_duration_seconds'][labels].observe(query_duration)
+
+    def render(self):
+        lines = [
+            '# HELP http_requests_total Requests handled, by route, method and status.',
+            '# TYPE http_requests_total counter',
+        ]
+        with self.lock:
+            for (route, method, status_code), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{{_labels(route=route, method=method, status=status_code)}}} {count}')
+
+            for name, (description, _) in self.histograms.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for (route, method), histogram in sorted(self.observations[name].items()):
+                    labels = _labels(route=route, method=method)
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,104 @@
+import logging
+import time
+from contextlib import ExitStack
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates WebSocket connections with a simplejwt access token.
+
+    Browsers cannot set headers on a WebSocket handshake, so the token is read
+    from the ``token`` query string parameter.
+    """
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+        scope = dict(scope, user=await self.get_user(token))
+        return await super().__call__(scope, receive, send)
+
+    @database_sync_to_async
+    def get_user(self, raw_token):
+        if not raw_token:
+            return AnonymousUser()
+        authentication = JWTAuthentication()
+        try:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        except (InvalidToken, AuthenticationFailed):
+            return AnonymousUser()
+
+
+class QueryCounter:
+    """
+    ``execute_wrapper`` hook counting SQL statements and the time spent in them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures wall time, SQL query count and SQL time of every request.
+
+    The numbers are returned in a ``Server-Timing`` header, recorded per route
+    for the ``/metrics`` endpoint, and requests over REQUEST_QUERY_BUDGET
+    queries or REQUEST_TIME_BUDGET_MS milliseconds are logged as warnings.
+
+    Streaming responses (the ledger export) run most of their queries while
+    the body is iterated, after this middleware has returned, so only the
+    work done before the first byte is counted and timed for them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        registry.observe_request(route, request.method, response.status_code, duration, counter.count, counter.duration)
+
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries"'
+        )
+
+        query_budget = getattr(settings, 'REQUEST_QUERY_BUDGET', None)
+        time_budget = getattr(settings, 'REQUEST_TIME_BUDGET_MS', None)
+        if (query_budget is not None and counter.count > query_budget) or \
+                (time_budget is not None and duration * 1000 > time_budget):
+            logger.warning(
+                "Request over budget: %s %s (%s) took %.1f ms with %d queries (%.1f ms in SQL)",
+                request.method, request.path, route, duration * 1000, counter.count, counter.duration * 1000,
+            )
+        return response
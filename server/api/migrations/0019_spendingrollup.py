@@ -0,0 +1,54 @@
+# Generated by Django 5.1.2 on 2026-10-17 14:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Income = apps.get_model('api', 'Income')
+    Expense = apps.get_model('api', 'Expense')
+    SpendingRollup = apps.get_model('api', 'SpendingRollup')
+
+    rows = [
+        SpendingRollup(user_id=row['user_id'], day=row['date'], source_id=row['source_id'],
+                       income_total=row['total'], income_count=row['count'])
+        for row in Income.objects.values('user_id', 'date', 'source_id').annotate(total=Sum('amount'), count=Count('id')).order_by()
+    ]
+    rows += [
+        SpendingRollup(user_id=row['user_id'], day=row['date'], category_id=row['category_id'],
+                       expense_total=row['total'], expense_count=row['count'])
+        for row in Expense.objects.values('user_id', 'date', 'category_id').annotate(total=Sum('amount'), count=Count('id')).order_by()
+    ]
+    SpendingRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_groupchat_groupchatmessage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('income_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('income_count', models.IntegerField(default=0)),
+                ('expense_count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='api.category')),
+                ('source', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='api.incomesource')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'day'], name='rollup_user_day_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'day', 'category'), name='unique_category_rollup'), models.UniqueConstraint(condition=models.Q(('source__isnull', False)), fields=('user', 'day', 'source'), name='unique_source_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_spendingrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialgoals',
+            name='last_transfer_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-17 14:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_financialgoals_last_transfer_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='billreminder',
+            index=models.Index(fields=['user', 'due_date'], name='bill_user_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billreminder',
+            index=models.Index(fields=['user', 'is_paid', 'due_date'], name='bill_user_paid_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['user', 'name'], name='category_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'created_at'], name='expense_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialgoalcontribution',
+            index=models.Index(fields=['goal', 'date'], name='goalcontrib_goal_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialgoalcontribution',
+            index=models.Index(fields=['user', 'date'], name='goalcontrib_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupchatmessage',
+            index=models.Index(fields=['group_chat', 'created_at'], name='chatmessage_chat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['user', 'date'], name='income_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['user', 'created_at'], name='income_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incomesource',
+            index=models.Index(fields=['user', 'source_name'], name='source_user_name_idx'),
+        ),
+    ]
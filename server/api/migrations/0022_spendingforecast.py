@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-17 15:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_ledger_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('spent', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('projected_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('daily_rate', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('generated_on', models.DateField()),
+                ('budget', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='api.budget')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='api.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('budget__isnull', False)), fields=('budget',), name='unique_budget_forecast'), models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'category'), name='unique_category_forecast')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-17 15:04
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_remind_on(apps, schema_editor):
+    BillReminder = apps.get_model('api', 'BillReminder')
+    last_pk = 0
+    while True:
+        bills = list(BillReminder.objects.filter(pk__gt=last_pk).order_by('pk').only('due_date', 'reminder_time')[:2000])
+        if not bills:
+            break
+        last_pk = bills[-1].pk
+        for bill in bills:
+            bill.remind_on = bill.due_date - timedelta(days=bill.reminder_time)
+        BillReminder.objects.bulk_update(bills, ['remind_on'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_spendingforecast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billreminder',
+            name='remind_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='billreminder',
+            name='reminder_sent_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='billreminder',
+            index=models.Index(condition=models.Q(('is_paid', False), ('reminder_sent_on__isnull', True)), fields=['remind_on', 'user'], name='bill_pending_reminder_idx'),
+        ),
+        migrations.RunPython(backfill_remind_on, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-17 15:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_bill_reminder_dispatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billreminder',
+            name='series',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='api.billreminder'),
+        ),
+        migrations.AddConstraint(
+            model_name='billreminder',
+            constraint=models.UniqueConstraint(fields=('series', 'due_date'), name='unique_bill_occurrence'),
+        ),
+    ]
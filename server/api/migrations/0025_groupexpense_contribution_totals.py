@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-17 15:07
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    GroupExpense = apps.get_model('api', 'GroupExpense')
+    GroupExpenseContribution = apps.get_model('api', 'GroupExpenseContribution')
+    contributions = GroupExpenseContribution.objects.filter(group_expense=OuterRef('pk')).order_by().values('group_expense')
+    GroupExpense.objects.update(
+        contributed_total=Coalesce(
+            Subquery(contributions.annotate(total=Sum('amount')).values('total')),
+            Value(Decimal('0.00')), output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        contributor_count=Coalesce(
+            Subquery(contributions.annotate(count=Count('user', distinct=True)).values('count')), Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_bill_series'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupexpense',
+            name='contributed_total',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='groupexpense',
+            name='contributor_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
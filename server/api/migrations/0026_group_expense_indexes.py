@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-17 15:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_groupexpense_contribution_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupexpense',
+            index=models.Index(fields=['group', 'date'], name='groupexpense_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupmember',
+            index=models.Index(fields=['user', 'group'], name='groupmember_user_group_idx'),
+        ),
+    ]
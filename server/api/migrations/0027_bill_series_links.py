@@ -0,0 +1,64 @@
+# Generated by Django 5.1.2 on 2026-10-17 15:20
+
+from itertools import groupby
+
+import api.models
+from django.db import migrations, models
+
+RECURRING_INTERVALS = ['monthly', 'quarterly', 'weekly', 'yearly']
+
+
+def link_bill_series(apps, schema_editor):
+    """
+    Bills created by mark_paid before 0024 carry no series, so each one
+    looked like the first bill of its own series. Bills of the same user,
+    name, amount and interval are linked to the earliest of them. Only links
+    are written: a bill due on a day its chain already has (e.g. a second,
+    separate membership with the same name and amount) stays the first bill
+    of its own series.
+    """
+    BillReminder = apps.get_model('api', 'BillReminder')
+    chain_key = ('user_id', 'bill_name', 'amount', 'recurring_interval')
+    bills = (
+        BillReminder.objects.filter(recurring_interval__in=RECURRING_INTERVALS)
+        .order_by(*chain_key, 'due_date', '-is_paid', 'id')
+        .only(*chain_key, 'due_date', 'is_paid', 'series')
+    )
+    user_ids = list(bills.order_by('user_id').values_list('user_id', flat=True).distinct())
+    for offset in range(0, len(user_ids), 500):
+        # Whole users at a time, read before anything is written.
+        rows = list(bills.filter(user_id__in=user_ids[offset:offset + 500]))
+        for _, chain in groupby(rows, key=lambda bill: tuple(getattr(bill, field) for field in chain_key)):
+            link_chain(BillReminder, list(chain))
+
+
+def link_chain(BillReminder, chain):
+    root = chain[0]
+    linked_dates = {root.due_date}
+    for bill in chain:
+        if bill is not root and bill.due_date not in linked_dates:
+            linked_dates.add(bill.due_date)
+            bill.series_id = root.pk
+        else:
+            bill.series_id = None
+
+    # Links are cleared first so the (series, due_date) constraint only sees
+    # the final state.
+    BillReminder.objects.filter(pk__in=[bill.pk for bill in chain]).update(series=None)
+    BillReminder.objects.bulk_update([bill for bill in chain if bill.series_id], ['series'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_group_expense_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='billreminder',
+            name='series',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=api.models.promote_next_occurrence, related_name='occurrences', to='api.billreminder'),
+        ),
+        migrations.RunPython(link_bill_series, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,21 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from datetime import date
 
+from .cache import invalidate
+
 class IncomeSource(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='incomesource')
     source_name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'source_name'], name='source_user_name_idx'),
+        ]
+
 class Income(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='income')
     source = models.ForeignKey(IncomeSource, on_delete=models.CASCADE, related_name='incomes')
@@ -17,6 +25,12 @@ class Income(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='income_user_date_idx'),
+            models.Index(fields=['user', 'created_at'], name='income_user_created_idx'),
+        ]
+
 
 class Expense(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -27,12 +41,51 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+            models.Index(fields=['user', 'created_at'], name='expense_user_created_idx'),
+        ]
+
 class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name'], name='category_user_name_idx'),
+        ]
+
+class SpendingRollup(models.Model):
+    """
+    Pre-aggregated daily ledger totals for a user.
+
+    Expenses are rolled up per (user, day, category) and incomes per
+    (user, day, source). Rows are maintained incrementally by the Income and
+    Expense signals (see ``api/rollups.py``) and can be rebuilt with the
+    ``rebuild_rollups`` management command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rollups')
+    day = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='rollups')
+    source = models.ForeignKey(IncomeSource, on_delete=models.CASCADE, null=True, blank=True, related_name='rollups')
+    income_total = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    expense_total = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    income_count = models.IntegerField(default=0)
+    expense_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'category'], condition=models.Q(category__isnull=False), name='unique_category_rollup'),
+            models.UniqueConstraint(fields=['user', 'day', 'source'], condition=models.Q(source__isnull=False), name='unique_source_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day'], name='rollup_user_day_idx'),
+        ]
+
+
 class FinancialGoals(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='financial_goals')
     name = models.CharField(max_length=255)
@@ -47,6 +100,7 @@ class FinancialGoals(models.Model):
         ('monthly', 'Monthly')
     ], blank=True)
     income_source = models.ForeignKey(IncomeSource, on_delete=models.SET_NULL, null=True, blank=True, related_name='financial_goals')
+    last_transfer_date = models.DateField(null=True, blank=True)  # Last run of transfer_to_financial_goals that moved money
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -57,6 +111,12 @@ class FinancialGoalContribution(models.Model):
     amount = models.DecimalField(max_digits=15, decimal_places=2)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['goal', 'date'], name='goalcontrib_goal_date_idx'),
+            models.Index(fields=['user', 'date'], name='goalcontrib_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} contributed {self.amount} to {self.goal.name}"
 
@@ -80,6 +140,10 @@ class GroupMember(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     class Meta:
         unique_together = ('group', 'user') 
+        indexes = [
+            # "Groups of this user" subqueries are answered from the index alone.
+            models.Index(fields=['user', 'group'], name='groupmember_user_group_idx'),
+        ]
 
 
 class GroupExpense(models.Model):
@@ -89,10 +153,18 @@ class GroupExpense(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
+    # Running totals of the contributions, maintained by api/groups.py
+    contributed_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, editable=False)
+    contributor_count = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.description} - {self.amount}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['group', 'date'], name='groupexpense_group_date_idx'),
+        ]
+
 
 class GroupExpenseContribution(models.Model):
     group_expense = models.ForeignKey(GroupExpense, on_delete=models.CASCADE, related_name='contributions')
@@ -128,6 +200,11 @@ class GroupChatMessage(models.Model):
     message = models.CharField(max_length=122)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['group_chat', 'created_at'], name='chatmessage_chat_created_idx'),
+        ]
     
 
 class Budget(models.Model):
@@ -149,12 +226,17 @@ class Budget(models.Model):
         return self.total_income - self.total_expenses
 
     def add_income(self, amount):
-        self.total_income += amount
-        self.save()
+        self._increment('total_income', amount)
 
     def add_expense(self, amount):
-        self.total_expenses += amount
-        self.save()
+        self._increment('total_expenses', amount)
+
+    def _increment(self, field, amount):
+        # Increment in the database so concurrent writers don't lose updates.
+        # update() sends no post_save, so the cached budgets are dropped here.
+        Budget.objects.filter(pk=self.pk).update(updated_at=timezone.now(), **{field: models.F(field) + amount})
+        invalidate('budgets', self.user_id)
+        self.refresh_from_db(fields=[field, 'updated_at'])
 
     def is_over_budget(self):
         return self.total_expenses > self.budget_limit
@@ -169,8 +251,55 @@ class Budget(models.Model):
         self.save()
 
 
+class SpendingForecast(models.Model):
+    """
+    Projected end-of-period spending, either for a budget's current period
+    or for a category over the current month.
+
+    Rows are replaced nightly by the ``compute_spending_forecasts`` task
+    (see ``api/forecast.py``); requests only read them.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='forecasts')
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, null=True, blank=True, related_name='forecasts')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='forecasts')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    spent = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    projected_total = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    daily_rate = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    generated_on = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['budget'], condition=models.Q(budget__isnull=False), name='unique_budget_forecast'),
+            models.UniqueConstraint(fields=['user', 'category'], condition=models.Q(category__isnull=False), name='unique_category_forecast'),
+        ]
+
+
 from datetime import timedelta
 
+from .recurrence import next_due_date
+
+
+def promote_next_occurrence(collector, field, sub_objs, using):
+    """
+    ``on_delete`` for ``BillReminder.series``: when a series' first bill is
+    deleted, its earliest remaining occurrence becomes the new first bill
+    and the others move to it, so upcoming bills survive as one series.
+    """
+    deleted = collector.data.get(field.model, set())
+    remaining = {}
+    for bill in sub_objs:
+        if bill not in deleted:
+            remaining.setdefault(bill.series_id, []).append(bill)
+    bills = field.model._base_manager.using(using)
+    for occurrences in remaining.values():
+        root, *rest = sorted(occurrences, key=lambda bill: (bill.due_date, bill.pk))
+        # Written now rather than as collector field updates, so the new
+        # first bill is seen if it is collected for deletion later on.
+        bills.filter(pk=root.pk).update(series=None)
+        bills.filter(pk__in=[bill.pk for bill in rest]).update(series=root)
+
 
 class BillReminder(models.Model):
 
@@ -191,40 +320,73 @@ class BillReminder(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     is_paid = models.BooleanField(default=False)
     payment_date = models.DateField(null=True, blank=True)  # Tracks when the bill was paid
+    # due_date - reminder_time, kept in sync by save() so reminders are one indexed range scan
+    remind_on = models.DateField(null=True, blank=True, editable=False)
+    reminder_sent_on = models.DateField(null=True, blank=True, editable=False)
+    # The first bill of a recurring series; None on that first bill itself
+    series = models.ForeignKey('self', on_delete=promote_next_occurrence, null=True, blank=True, editable=False, related_name='occurrences')
 
     def __str__(self):
         return f"{self.bill_name} due on {self.due_date}"
 
+    def save(self, *args, **kwargs):
+        remind_on = self.due_date - timedelta(days=self.reminder_time)
+        if remind_on != self.remind_on:
+            # A new reminder date also needs a new reminder.
+            self.remind_on = remind_on
+            self.reminder_sent_on = None
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'remind_on', 'reminder_sent_on'}
+        super().save(*args, **kwargs)
+
     def get_next_due_date(self):
         """
         Returns the next due date for the recurring bill based on the current due date and the recurring interval.
         """
-        next_due_date = self.due_date
-        if self.recurring_interval == 'monthly':
-            next_due_date = next_due_date.replace(month=next_due_date.month % 12 + 1)
-        elif self.recurring_interval == 'quarterly':
-            next_due_date = next_due_date.replace(month=((next_due_date.month - 1) // 3 + 1) * 3 + 1)
-        elif self.recurring_interval == 'weekly':
-            next_due_date += timedelta(weeks=1)
-        elif self.recurring_interval == 'yearly':
-            next_due_date = next_due_date.replace(year=next_due_date.year + 1)
-        return next_due_date
+        anchor = self.series.due_date if self.series_id else self.due_date
+        return next_due_date(self.due_date, self.recurring_interval, anchor.day) or self.due_date
 
-    def create_recurring_bill(self):
+    def build_occurrence(self, due_date):
         """
-        Creates a new recurring bill for the next due date without marking it as paid.
+        An unsaved, unpaid copy of this bill in the same series, due on ``due_date``.
         """
-        next_due_date = self.get_next_due_date()
-        BillReminder.objects.create(
-            user=self.user,
+        return BillReminder(
+            user_id=self.user_id,
+            series_id=self.series_id or self.pk,
             bill_name=self.bill_name,
             amount=self.amount,
             category=self.category,
-            due_date=next_due_date,
+            due_date=due_date,
             recurring_interval=self.recurring_interval,
             reminder_time=self.reminder_time,
-            is_paid=False
+            is_paid=False,
+            # Set here as well as in save() because occurrences are bulk created.
+            remind_on=due_date - timedelta(days=self.reminder_time),
+        )
+
+    def create_recurring_bill(self):
+        """
+        Creates a new recurring bill for the next due date without marking it as paid.
+        Returns the existing one if the scheduled job already created it.
+        """
+        next_due = self.get_next_due_date()
+        occurrence = self.build_occurrence(next_due)
+        bill, _ = BillReminder.objects.get_or_create(
+            series_id=occurrence.series_id, due_date=next_due,
+            defaults={field: getattr(occurrence, field) for field in (
+                'user_id', 'bill_name', 'amount', 'category', 'recurring_interval', 'reminder_time', 'is_paid')},
         )
+        return bill
 
     class Meta:
         ordering = ['due_date']
+        indexes = [
+            models.Index(fields=['user', 'due_date'], name='bill_user_due_idx'),
+            models.Index(fields=['user', 'is_paid', 'due_date'], name='bill_user_paid_due_idx'),
+            # Only bills still waiting for a reminder are indexed.
+            models.Index(fields=['remind_on', 'user'], name='bill_pending_reminder_idx',
+                         condition=models.Q(is_paid=False, reminder_sent_on__isnull=True)),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'due_date'], name='unique_bill_occurrence'),
+        ]
@@ -0,0 +1,59 @@
+import json
+import sys
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseNotifier:
+    """
+    Delivers bill reminders. Subclasses implement ``send_bill_reminders``,
+    which gets one user and all of that user's bills due for a reminder, and
+    raise on failure so the bills are retried on the next run.
+    """
+
+    def send_bill_reminders(self, user, bills):
+        raise NotImplementedError
+
+    def render(self, user, bills):
+        return {
+            'user': user.username,
+            'email': user.email,
+            'bills': [
+                {'id': bill.id, 'bill_name': bill.bill_name, 'amount': str(bill.amount), 'due_date': bill.due_date.isoformat()}
+                for bill in bills
+            ],
+        }
+
+
+class ConsoleNotifier(BaseNotifier):
+    """
+    Writes each reminder as a line of text, for local development.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send_bill_reminders(self, user, bills):
+        names = ', '.join(f"{bill.bill_name} ({bill.amount} due {bill.due_date})" for bill in bills)
+        self.stream.write(f"Reminder for {user.username}: {names}\n")
+
+
+class FileNotifier(BaseNotifier):
+    """
+    Appends each reminder as a JSON line to NOTIFICATION_FILE_PATH.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.NOTIFICATION_FILE_PATH
+
+    def send_bill_reminders(self, user, bills):
+        with open(self.path, 'a') as fh:
+            fh.write(json.dumps(self.render(user, bills)) + '\n')
+
+
+def get_notifier():
+    """
+    An instance of the NOTIFICATION_BACKEND class.
+    """
+    return import_string(settings.NOTIFICATION_BACKEND)()
@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+# Upper bound for ``limit``/``page_size``, so no request can ask for an
+# unbounded page.
+MAX_PAGE_SIZE = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+
+class DefaultPagination(LimitOffsetPagination):
+    """
+    Project default: ``limit``/``offset`` pages of PAGE_SIZE rows. Querysets
+    must be ordered by a unique key so rows never move between pages.
+    """
+    max_limit = MAX_PAGE_SIZE
+
+
+class TimeOrderedCursorPagination(CursorPagination):
+    """
+    Keyset pages over a time-ordered resource, newest first. The trailing
+    ``-id`` breaks ties between rows created at the same moment, so no row is
+    skipped or repeated between pages.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class GroupExpensePagination(TimeOrderedCursorPagination):
+    ordering = ('-date', '-id')
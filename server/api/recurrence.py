@@ -0,0 +1,46 @@
+import calendar
+from datetime import timedelta
+
+# Months between occurrences; weekly bills step by seven days instead.
+INTERVAL_MONTHS = {
+    'monthly': 1,
+    'quarterly': 3,
+    'yearly': 12,
+}
+
+
+def add_months(day, months, anchor_day=None):
+    """
+    ``day`` moved by ``months``, on ``anchor_day`` (default: ``day.day``)
+    clamped to the length of the target month, so a bill anchored on the
+    31st falls on Feb 28/29 and returns to the 31st in March.
+    """
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return day.replace(year=year, month=month, day=min(anchor_day or day.day, calendar.monthrange(year, month)[1]))
+
+
+def next_due_date(due_date, interval, anchor_day=None):
+    """
+    The occurrence after ``due_date`` for a recurring interval, or None for
+    one-time bills.
+    """
+    if interval == 'weekly':
+        return due_date + timedelta(weeks=1)
+    if interval in INTERVAL_MONTHS:
+        return add_months(due_date, INTERVAL_MONTHS[interval], anchor_day)
+    return None
+
+
+def occurrences(due_date, interval, until, anchor_day=None):
+    """
+    Due dates after ``due_date`` up to and including ``until``, anchored on
+    ``anchor_day`` (default: ``due_date.day``).
+    """
+    anchor_day = anchor_day or due_date.day
+    current = next_due_date(due_date, interval, anchor_day)
+    while current is not None and current <= until:
+        yield current
+        current = next_due_date(current, interval, anchor_day)
+
@@ -0,0 +1,87 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Expense, Income, SpendingRollup
+
+
+def rollup_key(values):
+    """
+    The rollup bucket for the values of an Income or Expense row.
+    """
+    if 'category_id' in values:
+        return (values['user_id'], values['date'], values['category_id'], None)
+    return (values['user_id'], values['date'], None, values['source_id'])
+
+
+def apply_deltas(deltas):
+    """
+    Apply ``{rollup_key: (amount, count)}`` deltas with one atomic UPDATE per
+    bucket, creating missing buckets for positive deltas.
+    """
+    with transaction.atomic():
+        for (user_id, day, category_id, source_id), (amount, count) in deltas.items():
+            if not amount and not count:
+                continue
+            kind = 'expense' if category_id is not None else 'income'
+            key = {'user_id': user_id, 'day': day, 'category_id': category_id, 'source_id': source_id}
+            updates = {
+                f'{kind}_total': F(f'{kind}_total') + amount,
+                f'{kind}_count': F(f'{kind}_count') + count,
+            }
+            if SpendingRollup.objects.filter(**key).update(**updates) or count <= 0:
+                # Removals never create rows; the bucket may already be gone
+                # when its category or source is being cascade-deleted.
+                continue
+            try:
+                with transaction.atomic():
+                    SpendingRollup.objects.create(**key, **{f'{kind}_total': amount, f'{kind}_count': count})
+            except IntegrityError:
+                # Another transaction created the bucket first.
+                SpendingRollup.objects.filter(**key).update(**updates)
+
+
+def record_change(original, current):
+    """
+    Move an Income/Expense row's contribution from its ``original`` values to
+    its ``current`` ones. Either side may be None for a create or delete.
+    """
+    deltas = defaultdict(lambda: (Decimal('0.00'), 0))
+    for values, sign in ((original, -1), (current, 1)):
+        if values is None:
+            continue
+        key = rollup_key(values)
+        amount, count = deltas[key]
+        deltas[key] = (amount + sign * Decimal(str(values['amount'])), count + sign)
+    apply_deltas(deltas)
+
+
+def rebuild_rollups(user_ids=None):
+    """
+    Recompute rollups from the ledger, for every user or only ``user_ids``.
+    """
+    incomes = Income.objects.all()
+    expenses = Expense.objects.all()
+    rollups = SpendingRollup.objects.all()
+    if user_ids is not None:
+        incomes = incomes.filter(user_id__in=user_ids)
+        expenses = expenses.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    rows = [
+        SpendingRollup(user_id=row['user_id'], day=row['date'], source_id=row['source_id'],
+                       income_total=row['total'], income_count=row['count'])
+        for row in incomes.values('user_id', 'date', 'source_id').annotate(total=Sum('amount'), count=Count('id')).order_by()
+    ]
+    rows += [
+        SpendingRollup(user_id=row['user_id'], day=row['date'], category_id=row['category_id'],
+                       expense_total=row['total'], expense_count=row['count'])
+        for row in expenses.values('user_id', 'date', 'category_id').annotate(total=Sum('amount'), count=Count('id')).order_by()
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        SpendingRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .consumers import GroupChatConsumer
+
+websocket_urlpatterns = [
+    path('ws/groupchats/<int:group_id>/chat/', GroupChatConsumer.as_asgi(), name='group-chat-ws'),
+]
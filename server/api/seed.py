@@ -0,0 +1,126 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import (
+    BillReminder, Budget, Category, Expense, FinancialGoalContribution, FinancialGoals, Group, GroupChat,
+    GroupChatMessage, GroupExpense, GroupExpenseContribution, GroupMember, Income, IncomeSource,
+)
+from .groups import repair_contribution_totals
+from .rollups import rebuild_rollups
+
+CATEGORY_NAMES = ['Groceries', 'Rent', 'Transport', 'Dining', 'Utilities', 'Health', 'Entertainment', 'Shopping']
+SOURCE_NAMES = ['Salary', 'Freelance', 'Interest', 'Dividends']
+MERCHANTS = ['Corner Store', 'City Market', 'Metro', 'Cafe Bloom', 'Power Co', 'Pharmacy', 'Cinema', 'Bookshop']
+BILL_NAMES = ['Electricity', 'Water', 'Internet', 'Phone', 'Insurance', 'Gym']
+
+
+def seed_ledger(users=10, rows_per_user=1000, seed=0, start=None, days=365, batch_size=2000):
+    """
+    Create ``users`` users with categories, sources, incomes, expenses, budgets,
+    bills, goals with contributions and a shared group with expenses,
+    contributions and a chat, deterministically for a given ``seed``. Rows
+    are inserted with ``bulk_create`` and the spending rollups rebuilt.
+
+    Returns the created users.
+    """
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=days)
+
+    def money(low, high):
+        return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+    def day():
+        return start + timedelta(days=rng.randrange(days))
+
+    with transaction.atomic():
+        User.objects.bulk_create([User(username=f'seed-{seed}-{i}') for i in range(users)])
+        # Re-read rows instead of relying on bulk inserts returning primary keys.
+        created_users = list(User.objects.filter(username__startswith=f'seed-{seed}-').order_by('id'))
+
+        Category.objects.bulk_create([
+            Category(user=user, name=name) for user in created_users for name in CATEGORY_NAMES
+        ])
+        IncomeSource.objects.bulk_create([
+            IncomeSource(user=user, source_name=name) for user in created_users for name in SOURCE_NAMES
+        ])
+        categories = list(Category.objects.filter(user__in=created_users).order_by('id'))
+        sources = list(IncomeSource.objects.filter(user__in=created_users).order_by('id'))
+        categories_by_user = {}
+        for category in categories:
+            categories_by_user.setdefault(category.user_id, []).append(category)
+        sources_by_user = {}
+        for source in sources:
+            sources_by_user.setdefault(source.user_id, []).append(source)
+
+        incomes, expenses = [], []
+        for user in created_users:
+            for _ in range(rows_per_user // 5):
+                incomes.append(Income(user=user, source=rng.choice(sources_by_user[user.id]), amount=money(50, 3000),
+                                      description=rng.choice(SOURCE_NAMES), date=day()))
+            for _ in range(rows_per_user - rows_per_user // 5):
+                expenses.append(Expense(user=user, category=rng.choice(categories_by_user[user.id]), amount=money(1, 300),
+                                        description=rng.choice(MERCHANTS), date=day()))
+        Income.objects.bulk_create(incomes, batch_size=batch_size)
+        Expense.objects.bulk_create(expenses, batch_size=batch_size)
+
+        totals = {user.id: [Decimal(0), Decimal(0)] for user in created_users}
+        for income in incomes:
+            totals[income.user_id][0] += income.amount
+        for expense in expenses:
+            totals[expense.user_id][1] += expense.amount
+        Budget.objects.bulk_create([
+            Budget(user=user, name='Monthly Budget', period='monthly', budget_limit=money(1000, 4000),
+                   total_income=totals[user.id][0], total_expenses=totals[user.id][1])
+            for user in created_users
+        ])
+
+        bills = [
+            BillReminder(user=user, bill_name=name, amount=money(10, 200), category='Utilities', due_date=day(),
+                         recurring_interval=rng.choice(['monthly', 'quarterly', 'weekly', 'yearly', 'one_time']),
+                         reminder_time=rng.randint(1, 7), is_paid=rng.random() < 0.5)
+            for user in created_users for name in BILL_NAMES
+        ]
+        for bill in bills:
+            # bulk_create skips BillReminder.save(), which normally sets this.
+            bill.remind_on = bill.due_date - timedelta(days=bill.reminder_time)
+        BillReminder.objects.bulk_create(bills, batch_size=batch_size)
+
+        FinancialGoals.objects.bulk_create([
+            FinancialGoals(user=user, name=f'Goal {i}', target_amount=money(1000, 5000), allocated_amount=money(1, 20),
+                           target_date=start + timedelta(days=days + 365), recurrence=rng.choice(['daily', 'weekly', 'monthly']),
+                           income_source=sources_by_user[user.id][0])
+            for user in created_users for i in range(2)
+        ])
+        goals = list(FinancialGoals.objects.filter(user__in=created_users).order_by('id'))
+        FinancialGoalContribution.objects.bulk_create([
+            FinancialGoalContribution(goal=goal, user_id=goal.user_id, amount=money(5, 100))
+            for goal in goals for _ in range(rows_per_user // 50 or 1)
+        ], batch_size=batch_size)
+
+        group = Group.objects.create(name=f'Seed group {seed}', description='Seeded group', admin=created_users[0])
+        GroupMember.objects.bulk_create([GroupMember(group=group, user=user) for user in created_users])
+        GroupExpense.objects.bulk_create([
+            GroupExpense(group=group, user=rng.choice(created_users), title=rng.choice(MERCHANTS), amount=money(20, 500),
+                         description=f'Shared expense {i}')
+            for i in range(max(users * rows_per_user // 100, 1))
+        ], batch_size=batch_size)
+        group_expenses = list(GroupExpense.objects.filter(group=group).order_by('id'))
+        GroupExpenseContribution.objects.bulk_create([
+            GroupExpenseContribution(group_expense=expense, user=user, amount=(expense.amount / users).quantize(Decimal('0.01')))
+            for expense in group_expenses for user in rng.sample(created_users, min(users, 3))
+        ], batch_size=batch_size)
+        repair_contribution_totals([group.id])
+
+        chat = GroupChat.objects.create(group=group)
+        GroupChatMessage.objects.bulk_create([
+            GroupChatMessage(group_chat=chat, user=rng.choice(created_users), message=f'Message {i}')
+            for i in range(rows_per_user)
+        ], batch_size=batch_size)
+
+        rebuild_rollups([user.id for user in created_users])
+
+    return created_users
@@ -0,0 +1,104 @@
+import heapq
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import DecimalField, Exists, F, Func, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import GroupExpense, GroupExpenseContribution, GroupMember
+
+CENT = Decimal('0.01')
+MONEY = DecimalField(max_digits=15, decimal_places=2)
+
+
+def _sum(queryset, field):
+    """
+    Scalar subquery summing ``field`` over ``queryset``, 0 when empty.
+    """
+    # A plain SUM() call rather than Sum() keeps GROUP BY out of the subquery.
+    total = queryset.order_by().annotate(total=Func(F(field), function='SUM', output_field=MONEY)).values('total')[:1]
+    return Coalesce(Subquery(total), Value(Decimal('0.00')), output_field=MONEY)
+
+
+def member_balances(group):
+    """
+    What every member paid, their share and the balance between the two.
+
+    A member pays by fronting group expenses and by contributing to other
+    members' expenses; contributions received on their own expenses are money
+    paid back. Every expense is shared equally by the current members, with
+    left-over cents going to the lowest user ids. People who left the group
+    keep what they paid but take no share, so the balances still add up to
+    zero. All sums come from one query.
+    """
+    expenses = GroupExpense.objects.filter(group=group)
+    contributions = GroupExpenseContribution.objects.filter(group_expense__group=group)
+    memberships = GroupMember.objects.filter(group=group)
+    rows = list(
+        User.objects.filter(
+            Q(pk__in=memberships.values('user')) | Q(pk__in=expenses.values('user'))
+            | Q(pk__in=contributions.values('user'))
+        )
+        .annotate(
+            member=Exists(memberships.filter(user=OuterRef('pk'))),
+            fronted=_sum(expenses.filter(user=OuterRef('pk')), 'amount'),
+            contributed=_sum(contributions.filter(user=OuterRef('pk')), 'amount'),
+            received=_sum(contributions.filter(group_expense__user=OuterRef('pk')), 'amount'),
+            group_total=_sum(expenses, 'amount'),
+        )
+        .values('pk', 'username', 'member', 'fronted', 'contributed', 'received', 'group_total')
+        .order_by('pk')
+    )
+    member_count = sum(row['member'] for row in rows)
+    if not member_count:
+        return []
+
+    share_cents, remainder = divmod(int(rows[0]['group_total'] / CENT), member_count)
+    balances = []
+    member_index = 0
+    for row in rows:
+        paid = row['fronted'] + row['contributed'] - row['received']
+        share = Decimal('0.00')
+        if row['member']:
+            share = (share_cents + (member_index < remainder)) * CENT
+            member_index += 1
+        balances.append({
+            'user': row['pk'], 'username': row['username'], 'member': row['member'],
+            'paid': paid, 'share': share, 'balance': paid - share,
+        })
+    return balances
+
+
+def simplify_debts(balances):
+    """
+    Transfers settling ``balances`` (positive: is owed, negative: owes).
+
+    The largest debtor repeatedly pays the largest creditor, using two heaps,
+    which settles n members with at most n - 1 transfers in O(n log n).
+    """
+    creditors = [(-int(row['balance'] / CENT), row['user']) for row in balances if row['balance'] > 0]
+    debtors = [(int(row['balance'] / CENT), row['user']) for row in balances if row['balance'] < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append({'from_user': debtor, 'to_user': creditor, 'amount': amount * CENT})
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
+
+
+def settle_group(group):
+    balances = member_balances(group)
+    usernames = {row['user']: row['username'] for row in balances}
+    transfers = [
+        dict(transfer, from_username=usernames[transfer['from_user']], to_username=usernames[transfer['to_user']])
+        for transfer in simplify_debts(balances)
+    ]
+    return {'group': group.pk, 'balances': balances, 'transfers': transfers}
@@ -1,18 +1,98 @@
 # api/signals.py
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.timezone import localdate
-from .models import Budget
+from .budgets import reset_stale_budgets
+from .cache import invalidate
+from .models import (
+    Budget, Category, Expense, FinancialGoalContribution, FinancialGoals, GroupExpense, GroupExpenseContribution,
+    GroupMember, Income, IncomeSource,
+)
+from .rollups import record_change
 
 @receiver(post_migrate)  
 def reset_budgets_for_new_day(sender, **kwargs):
-    today = localdate()
+    if sender.name != 'api':
+        return
+    reset_stale_budgets(localdate())
 
-   
-    budgets = Budget.objects.filter(last_reset_date__lt=today)
 
-    for budget in budgets:
-       
-        budget.reset_budget()
+# Spending rollups follow every Income/Expense write.
 
-        budget.update_reset_date()
+ROLLUP_FIELDS = {
+    Income: ('user_id', 'date', 'source_id', 'amount'),
+    Expense: ('user_id', 'date', 'category_id', 'amount'),
+}
+
+
+def _rollup_values(instance):
+    return {field: getattr(instance, field) for field in ROLLUP_FIELDS[type(instance)]}
+
+
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=Expense)
+def remember_rollup_values(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._rollup_original = None
+    if instance.pk is not None:
+        instance._rollup_original = sender.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS[sender]).first()
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_change(getattr(instance, '_rollup_original', None), _rollup_values(instance))
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    record_change(_rollup_values(instance), None)
+
+
+# Cached API responses (api/cache.py) are dropped when their models change.
+
+CACHE_SCOPES = {
+    Category: 'category',
+    IncomeSource: 'source',
+    Budget: 'budgets',
+    FinancialGoals: 'goals',
+    FinancialGoalContribution: 'goals',
+}
+
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    invalidate(CACHE_SCOPES[sender], instance.user_id)
+
+
+for model in CACHE_SCOPES:
+    post_save.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'invalidate-{model.__name__}-save')
+    post_delete.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'invalidate-{model.__name__}-delete')
+
+
+# Group settlements are cached per group and depend on expenses, contributions
+# and membership (the member count sets everyone's share).
+
+def _contribution_group_id(contribution):
+    return GroupExpense.objects.filter(pk=contribution.group_expense_id).values_list('group_id', flat=True).first()
+
+
+SETTLEMENT_GROUP_IDS = {
+    GroupExpense: lambda expense: expense.group_id,
+    GroupMember: lambda member: member.group_id,
+    GroupExpenseContribution: _contribution_group_id,
+}
+
+
+def invalidate_settlement(sender, instance, **kwargs):
+    group_id = SETTLEMENT_GROUP_IDS[sender](instance)
+    if group_id is not None:
+        invalidate('settlement', group_id)
+
+
+for model in SETTLEMENT_GROUP_IDS:
+    post_save.connect(invalidate_settlement, sender=model, dispatch_uid=f'settlement-{model.__name__}-save')
+    post_delete.connect(invalidate_settlement, sender=model, dispatch_uid=f'settlement-{model.__name__}-delete')
@@ -1,31 +1,268 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+from operator import attrgetter
+
 from celery import shared_task
-from .models import FinancialGoals, Income
-from django.db.models import F
+from django.db import transaction
+from django.db.models import F, Max, Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localdate
+
+from .budgets import reset_stale_budgets
+from .cache import invalidate
+from .forecast import refresh_forecasts
+from .models import BillReminder, FinancialGoals, Income
+from .notifications import get_notifier
+from .recurrence import INTERVAL_MONTHS, add_months, occurrences
+from .rollups import apply_deltas, rollup_key
+
+logger = logging.getLogger(__name__)
+
+# Days of allocation moved per run for each goal recurrence.
+TRANSFER_MULTIPLIERS = {
+    'daily': 1,
+    'weekly': 7,
+    'monthly': 30,
+}
+
+
+def calculate_transfer_amount(goal):
+    return goal.allocated_amount * TRANSFER_MULTIPLIERS.get(goal.recurrence, 0)
+
+
+def due_for_transfer(run_date):
+    """
+    Goals whose last transfer is at least one recurrence period before
+    ``run_date``: a day, a week or a calendar month.
+    """
+    # On the last day of a month, a month back is the end of the month
+    # before, so a goal last moved on Jan 31 is due again on Feb 29.
+    month_end = (run_date + timedelta(days=1)).day == 1
+    month_ago = add_months(run_date, -1, 31 if month_end else None)
+    return Q(last_transfer_date__isnull=True) | Q(
+        Q(recurrence='daily', last_transfer_date__lt=run_date)
+        | Q(recurrence='weekly', last_transfer_date__lte=run_date - timedelta(weeks=1))
+        | Q(recurrence='monthly', last_transfer_date__lte=month_ago)
+    )
+
 
 @shared_task
-def transfer_to_financial_goals():
-    goals = FinancialGoals.objects.filter(current_amount__lt=F('target_amount'), recurring=True)
-    def calculate_transfer_amount(goal):
-        if goal.recurrence == 'daily':
-            return goal.allocated_amount  
-        elif goal.recurrence == 'weekly':
-            return goal.allocated_amount * 7  
-        elif goal.recurrence == 'monthly':
-            return goal.allocated_amount * 30  
-        return 0  
+def transfer_to_financial_goals(run_date=None, chunk_size=500):
+    """
+    Move each recurring goal's allocation out of the first income of its
+    income source.
+
+    Goals are processed in primary-key order, ``chunk_size`` at a time. Each
+    chunk loads its incomes in one query and writes all changes with
+    ``bulk_update`` in its own transaction, so locks are only held per chunk.
+    The task runs daily, but a goal is only transferred once per period of
+    its recurrence, counted from its ``last_transfer_date``; re-running it
+    for the same ``run_date`` (ISO date, defaults to today) is safe.
+
+    Returns counters describing the run.
+    """
+    run_date = parse_date(run_date) if isinstance(run_date, str) else (run_date or localdate())
+    metrics = {'run_date': run_date.isoformat(), 'chunks': 0, 'goals': 0, 'transferred': 0, 'skipped': 0, 'amount': Decimal('0.00')}
 
+    goals = FinancialGoals.objects.filter(
+        due_for_transfer(run_date),
+        current_amount__lt=F('target_amount'),
+        recurrence__in=TRANSFER_MULTIPLIERS,
+        income_source__isnull=False,
+    ).order_by('pk')
+
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(goals.filter(pk__gt=last_pk).select_for_update()[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            _transfer_chunk(chunk, run_date, metrics)
+        metrics['chunks'] += 1
+        logger.info("transfer_to_financial_goals %s: %d goals processed, %d transferred",
+                    metrics['run_date'], metrics['goals'], metrics['transferred'])
+
+    if metrics['transferred']:
+        # bulk_update skips the model signals that invalidate cached goals.
+        invalidate('goals')
+    metrics['amount'] = str(metrics['amount'])
+    logger.info("transfer_to_financial_goals finished: %s", metrics)
+    return metrics
+
+
+def _transfer_chunk(goals, run_date, metrics):
+    pairs = {(goal.user_id, goal.income_source_id) for goal in goals}
+
+    # The first income (lowest id) of every (user, source) pair in one query.
+    first_ids = (
+        Income.objects.filter(user_id__in={user_id for user_id, _ in pairs}, source_id__in={source_id for _, source_id in pairs})
+        .values('user_id', 'source_id')
+        .annotate(first_id=Min('id'))
+        .order_by()
+    )
+    income_ids = [row['first_id'] for row in first_ids if (row['user_id'], row['source_id']) in pairs]
+    incomes = {
+        (income.user_id, income.source_id): income
+        for income in Income.objects.select_for_update().filter(id__in=income_ids)
+    }
+
+    now = timezone.now()
+    changed_incomes = {}
+    changed_goals = []
+    rollup_deltas = {}
     for goal in goals:
-       
-        transfer_amount = calculate_transfer_amount(goal) 
-        income = Income.objects.filter(source=goal.income_source, user=goal.user).first()
-        
-
-        if income and income.amount >= transfer_amount:
-       
-            income.amount -= transfer_amount
-            income.save()
-            
-       
-            goal.current_amount += transfer_amount
-            goal.save()
-    
+        metrics['goals'] += 1
+        transfer_amount = calculate_transfer_amount(goal)
+        income = incomes.get((goal.user_id, goal.income_source_id))
+
+        if not transfer_amount or income is None or income.amount < transfer_amount:
+            metrics['skipped'] += 1
+            continue
+
+        income.amount -= transfer_amount
+        income.updated_at = now
+        changed_incomes[income.pk] = income
+
+        key = rollup_key({'user_id': income.user_id, 'date': income.date, 'source_id': income.source_id})
+        rollup_deltas[key] = (rollup_deltas.get(key, (Decimal('0.00'), 0))[0] - transfer_amount, 0)
+
+        goal.current_amount += transfer_amount
+        goal.last_transfer_date = run_date
+        goal.updated_at = now
+        changed_goals.append(goal)
+
+        metrics['transferred'] += 1
+        metrics['amount'] += transfer_amount
+
+    Income.objects.bulk_update(changed_incomes.values(), ['amount', 'updated_at'])
+    FinancialGoals.objects.bulk_update(changed_goals, ['current_amount', 'last_transfer_date', 'updated_at'])
+    # bulk_update bypasses the Income signals, so move the rollups here.
+    apply_deltas(rollup_deltas)
+
+
+@shared_task
+def reset_budgets(run_date=None):
+    """
+    Reset budgets whose daily, weekly or monthly period has rolled over.
+    Scheduled at midnight by Celery beat.
+    """
+    run_date = parse_date(run_date) if isinstance(run_date, str) else run_date
+    reset = reset_stale_budgets(run_date)
+    logger.info("reset_budgets: %s", reset)
+    return reset
+
+
+@shared_task
+def compute_spending_forecasts(run_date=None, chunk_size=1000):
+    """
+    Recompute every user's budget and category spending forecasts.
+    Scheduled nightly by Celery beat, after the budget reset.
+    """
+    run_date = parse_date(run_date) if isinstance(run_date, str) else (run_date or localdate())
+    metrics = dict(refresh_forecasts(run_date, chunk_size), run_date=run_date.isoformat())
+    logger.info("compute_spending_forecasts: %s", metrics)
+    return metrics
+
+
+@shared_task
+def send_bill_reminders(run_date=None, chunk_size=1000, catch_up_days=7):
+    """
+    Notify users about unpaid bills whose reminder date (``due_date -
+    reminder_time``) is ``run_date`` or up to ``catch_up_days`` before it,
+    with one notification per user covering all of their bills.
+
+    Pending bills are read from a partial index in user order, ``chunk_size``
+    at a time, and stamped with ``reminder_sent_on`` once delivered, so
+    re-running the task sends nothing twice. Bills of a user whose delivery
+    fails stay pending for the next run.
+    """
+    run_date = parse_date(run_date) if isinstance(run_date, str) else (run_date or localdate())
+    metrics = {'run_date': run_date.isoformat(), 'users': 0, 'bills': 0, 'failed_users': 0}
+    notifier = get_notifier()
+
+    pending = BillReminder.objects.filter(
+        is_paid=False, reminder_sent_on__isnull=True,
+        remind_on__gte=run_date - timedelta(days=catch_up_days), remind_on__lte=run_date,
+    ).select_related('user').order_by('user_id', 'id')
+
+    last_user_id = 0
+    while True:
+        bills = list(pending.filter(user_id__gt=last_user_id)[:chunk_size])
+        if not bills:
+            break
+        if len(bills) == chunk_size:
+            if bills[0].user_id == bills[-1].user_id:
+                bills = list(pending.filter(user_id=bills[0].user_id))
+            else:
+                # The last user may continue in the next chunk; keep their bills together.
+                bills = [bill for bill in bills if bill.user_id != bills[-1].user_id]
+        last_user_id = bills[-1].user_id
+
+        sent = []
+        for _, user_bills in groupby(bills, key=attrgetter('user_id')):
+            user_bills = list(user_bills)
+            try:
+                notifier.send_bill_reminders(user_bills[0].user, user_bills)
+            except Exception:
+                logger.exception("send_bill_reminders: delivery to user %s failed", user_bills[0].user_id)
+                metrics['failed_users'] += 1
+                continue
+            sent.extend(bill.id for bill in user_bills)
+            metrics['users'] += 1
+        BillReminder.objects.filter(id__in=sent).update(reminder_sent_on=run_date)
+        metrics['bills'] += len(sent)
+
+    logger.info("send_bill_reminders: %s", metrics)
+    return metrics
+
+
+@shared_task
+def generate_recurring_bills(run_date=None, horizon_days=60, chunk_size=1000):
+    """
+    Create the unpaid occurrences of every recurring bill series that fall
+    due from ``run_date`` to ``horizon_days`` after it.
+
+    Series roots are read ``chunk_size`` at a time, the latest occurrence of
+    each is found with one grouped query, and the missing ones are written
+    with ``bulk_create``. The unique (series, due_date) constraint makes
+    re-runs and concurrent ``mark_paid`` calls harmless.
+    """
+    run_date = parse_date(run_date) if isinstance(run_date, str) else (run_date or localdate())
+    until = run_date + timedelta(days=horizon_days)
+    metrics = {'run_date': run_date.isoformat(), 'series': 0, 'occurrences': 0}
+
+    roots = BillReminder.objects.filter(
+        series__isnull=True, recurring_interval__in=[*INTERVAL_MONTHS, 'weekly'],
+    ).order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(roots.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+
+        latest = dict(
+            BillReminder.objects.filter(series__in=chunk)
+            .values('series_id')
+            .annotate(last=Max('due_date'))
+            .values_list('series_id', 'last')
+            .order_by()
+        )
+        # Dates missed before run_date are past due already and not created.
+        bills = [
+            root.build_occurrence(due_date)
+            for root in chunk
+            for due_date in occurrences(max(root.due_date, latest.get(root.pk, root.due_date)),
+                                        root.recurring_interval, until, root.due_date.day)
+            if due_date >= run_date
+        ]
+        BillReminder.objects.bulk_create(bills, batch_size=1000, ignore_conflicts=True)
+        metrics['series'] += len(chunk)
+        metrics['occurrences'] += len(bills)
+
+    logger.info("generate_recurring_bills: %s", metrics)
+    return metrics
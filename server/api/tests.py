@@ -1,3 +1,1232 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from importlib import import_module
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.timezone import localdate
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from server.asgi import application
+
+from . import pagination
+from .metrics import registry
+from .models import IncomeSource, Income, Category, Expense, SpendingRollup, Budget, SpendingForecast, BillReminder, FinancialGoals, FinancialGoalContribution, Group, GroupMember, GroupExpense, GroupExpenseContribution, GroupChat, GroupChatMessage
+from .rollups import rebuild_rollups
+from .groups import add_contributions
+from .notifications import BaseNotifier, FileNotifier
+from .recurrence import next_due_date, occurrences
+from .tasks import compute_spending_forecasts, generate_recurring_bills, reset_budgets, send_bill_reminders, transfer_to_financial_goals
+
+
+class LedgerQueryCountTests(TestCase):
+    """
+    The ledger list endpoints must not issue a query per row for nested
+    sources and categories.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='ledger')
+        for i in range(5):
+            source = IncomeSource.objects.create(user=cls.user, source_name=f'Source {i}')
+            category = Category.objects.create(user=cls.user, name=f'Category {i}')
+            Income.objects.create(user=cls.user, source=source, amount=100 + i, description=f'Income {i}', date=date(2024, 1, i + 1))
+            Expense.objects.create(user=cls.user, category=category, amount=10 + i, description=f'Expense {i}', date=date(2024, 1, i + 1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_rows(self, count):
+        for i in range(count):
+            source = IncomeSource.objects.create(user=self.user, source_name=f'Extra source {i}')
+            category = Category.objects.create(user=self.user, name=f'Extra category {i}')
+            Income.objects.create(user=self.user, source=source, amount=1, description='extra', date=date(2024, 2, 1))
+            Expense.objects.create(user=self.user, category=category, amount=1, description='extra', date=date(2024, 2, 1))
+
+    def test_income_list_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/finance/income/')
+        self.assertEqual(response.status_code, 200)
+        self.add_rows(10)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/finance/income/')
+        self.assertEqual(len(response.data['results']), 15)
+        # Newest first, so the oldest row closes the page.
+        self.assertEqual(response.data['results'][-1]['source']['source_name'], 'Source 0')
+
+    def test_expense_list_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/finance/expense/')
+        self.assertEqual(response.status_code, 200)
+        self.add_rows(10)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/finance/expense/')
+        self.assertEqual(len(response.data['results']), 15)
+        self.assertEqual(response.data['results'][-1]['category']['name'], 'Category 0')
+
+    def test_transactions_query_count(self):
+        # One UNION query for the page keys plus one query per table.
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/transactions/')
+        self.assertEqual(len(response.data['results']), 10)
+        self.add_rows(10)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/transactions/')
+        self.assertEqual(len(response.data['results']), 30)
+
+
+class TransactionsFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='feed')
+        cls.salary = salary = IncomeSource.objects.create(user=cls.user, source_name='Salary')
+        gifts = IncomeSource.objects.create(user=cls.user, source_name='Gifts')
+        cls.food = Category.objects.create(user=cls.user, name='Food')
+        rent = Category.objects.create(user=cls.user, name='Rent')
+        for day in range(1, 4):
+            Income.objects.create(user=cls.user, source=salary if day < 3 else gifts, amount=100, description=f'Income {day}', date=date(2024, 1, day))
+            Expense.objects.create(user=cls.user, category=cls.food if day < 3 else rent, amount=10, description=f'Expense {day}', date=date(2024, 1, day))
+        # Everything created in the same instant, so only (id, type) orders the feed.
+        tied = timezone.make_aware(datetime(2024, 1, 5, 12))
+        Income.objects.update(created_at=tied)
+        Expense.objects.update(created_at=tied)
+
+        other = User.objects.create_user(username='feed-other')
+        Expense.objects.create(user=other, category=Category.objects.create(user=other, name='Other'), amount=1, description='Other', date=date(2024, 1, 2))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def descriptions(self, **params):
+        return [row['description'] for row in self.client.get('/api/v1/transactions/', params).data['results']]
+
+    def page_through(self, **params):
+        response = self.client.get('/api/v1/transactions/', {'page_size': 2, **params})
+        seen = [row['description'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [row['description'] for row in response.data['results']]
+        return seen
+
+    def test_keyset_pages_across_tied_timestamps(self):
+        oldest_first = [f'{kind} {day}' for day in range(1, 4) for kind in ('Expense', 'Income')]
+        self.assertEqual(self.page_through(), oldest_first[::-1])
+        self.assertEqual(self.page_through(ordering='created_at'), oldest_first)
+
+    def test_newest_first_by_default(self):
+        Expense.objects.filter(description='Expense 1').update(created_at=timezone.make_aware(datetime(2024, 1, 6)))
+        Income.objects.filter(description='Income 3').update(created_at=timezone.make_aware(datetime(2024, 1, 4)))
+        self.assertEqual(self.page_through(), ['Expense 1', 'Expense 3', 'Income 2', 'Expense 2', 'Income 1', 'Income 3'])
+
+    def test_filters(self):
+        self.assertEqual(self.descriptions(type='income'), ['Income 3', 'Income 2', 'Income 1'])
+        self.assertEqual(self.descriptions(category=self.food.id), ['Expense 2', 'Expense 1'])
+        self.assertEqual(self.descriptions(source=self.salary.id, ordering='created_at'), ['Income 1', 'Income 2'])
+        self.assertEqual(self.descriptions(type='income', category=self.food.id), [])
+        self.assertEqual(self.descriptions(date_from='2024-01-02', date_to='2024-01-02'), ['Income 2', 'Expense 2'])
+
+    def test_invalid_params(self):
+        for params in ({'category': 'abc'}, {'category': '\u00b2'}, {'source': '1; drop'}, {'type': 'transfer'}, {'date_from': 'yesterday'}, {'ordering': 'amount'}):
+            self.assertEqual(self.client.get('/api/v1/transactions/', params).status_code, 400, params)
+        for cursor in ('garbage', b64encode(b'["2024-01-01T00:00:00", 1, "loan"]').decode(), b64encode(b'{}').decode()):
+            self.assertEqual(self.client.get('/api/v1/transactions/', {'cursor': cursor}).status_code, 404, cursor)
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'PAGE_SIZE': 3})
+class PaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pages')
+        category = Category.objects.create(user=cls.user, name='Food')
+        for i in range(7):
+            Category.objects.create(user=cls.user, name=f'Category {i}')
+            Expense.objects.create(user=cls.user, category=category, amount=i + 1, description=f'Expense {i}', date=date(2024, 1, 1))
+        # Rows created in the same instant still page in a stable order.
+        Expense.objects.update(created_at=timezone.make_aware(datetime(2024, 1, 1, 12)))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_limit_offset_is_ordered_and_capped(self):
+        response = self.client.get('/api/v1/finance/category/', {'limit': 2, 'offset': 1})
+        self.assertEqual(response.data['count'], 8)
+        self.assertEqual([row['name'] for row in response.data['results']], ['Category 1', 'Category 2'])
+
+        with mock.patch.object(pagination.DefaultPagination, 'max_limit', 5):
+            response = self.client.get('/api/v1/finance/category/', {'limit': 10 ** 6})
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_cursor_pages_newest_first_without_gaps(self):
+        response = self.client.get('/api/v1/finance/expense/')
+        self.assertNotIn('count', response.data)
+        seen = [row['description'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [row['description'] for row in response.data['results']]
+        self.assertEqual(seen, [f'Expense {i}' for i in reversed(range(7))])
+
+        response = self.client.get('/api/v1/finance/income/', {'page_size': 10 ** 6})
+        self.assertEqual(response.status_code, 200)
+
+
+class GroupQueryCountTests(TestCase):
+    """
+    Group list/detail render with a fixed number of queries.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin')
+        cls.group = Group.objects.create(name='Trip', admin=cls.admin)
+        GroupMember.objects.create(group=cls.group, user=cls.admin)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_expenses(self, count):
+        for i in range(count):
+            member = User.objects.create_user(username=f'member-{self.group.members.count()}')
+            GroupMember.objects.create(group=self.group, user=member)
+            expense = GroupExpense.objects.create(group=self.group, user=self.admin, title=f'Expense {i}', amount=30, description='shared')
+            add_contributions(expense, [
+                GroupExpenseContribution(user=self.admin, amount=10), GroupExpenseContribution(user=member, amount=5),
+            ])
+
+    def test_group_list_query_count(self):
+        # The page count plus groups, members and expenses with their contributions.
+        self.add_expenses(2)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/v1/finance/group/')
+        self.add_expenses(8)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/v1/finance/group/')
+        group = response.data['results'][0]
+        self.assertEqual(group['admin'], 'admin')
+        self.assertEqual(len(group['members']), 11)
+        self.assertEqual(len(group['expenses']), 10)
+        self.assertEqual(group['expenses'][0]['total_contributions'], 15)
+
+    def test_group_detail_query_count(self):
+        self.add_expenses(5)
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/v1/finance/group/{self.group.id}/')
+        self.assertEqual(len(response.data['expenses']), 5)
+
+
+class GroupSettlementTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol = [User.objects.create_user(username=name) for name in ('alice', 'bob', 'carol')]
+        cls.group = Group.objects.create(name='Trip', admin=cls.alice)
+        GroupMember.objects.bulk_create([GroupMember(group=cls.group, user=user) for user in (cls.alice, cls.bob, cls.carol)])
+        cls.hotel = GroupExpense.objects.create(group=cls.group, user=cls.alice, title='Hotel', amount=90, description='Hotel')
+        GroupExpense.objects.create(group=cls.group, user=cls.bob, title='Fuel', amount=30, description='Fuel')
+        GroupExpenseContribution.objects.create(group_expense=cls.hotel, user=cls.carol, amount=10)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+
+    def test_balances_and_transfers(self):
+        with self.assertNumQueries(2):
+            data = self.client.get(f'/api/v1/finance/group/{self.group.id}/settlement/').data
+        self.assertEqual([(row['username'], row['paid'], row['share'], row['balance']) for row in data['balances']],
+                         [('alice', '80.00', '40.00', '40.00'), ('bob', '30.00', '40.00', '-10.00'), ('carol', '10.00', '40.00', '-30.00')])
+        self.assertEqual([(row['from_username'], row['to_username'], row['amount']) for row in data['transfers']],
+                         [('carol', 'alice', '30.00'), ('bob', 'alice', '10.00')])
+        self.assertEqual(sum(Decimal(row['balance']) for row in data['balances']), 0)
+
+    def test_former_members_keep_what_they_paid(self):
+        dave = User.objects.create_user(username='dave')
+        membership = GroupMember.objects.create(group=self.group, user=dave)
+        GroupExpense.objects.create(group=self.group, user=dave, title='Tickets', amount=90, description='Tickets')
+        membership.delete()
+        balances = self.client.get(f'/api/v1/finance/group/{self.group.id}/settlement/').data['balances']
+        self.assertEqual([(row['username'], row['member'], row['share'], row['balance']) for row in balances],
+                         [('alice', True, '70.00', '10.00'), ('bob', True, '70.00', '-40.00'),
+                          ('carol', True, '70.00', '-60.00'), ('dave', False, '0.00', '90.00')])
+        self.assertEqual(sum(Decimal(row['balance']) for row in balances), 0)
+
+    def test_cached_until_the_group_changes(self):
+        url = f'/api/v1/finance/group/{self.group.id}/settlement/'
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        GroupExpenseContribution.objects.create(group_expense=self.hotel, user=self.bob, amount=10)
+        data = self.client.get(url).data
+        self.assertEqual([row['balance'] for row in data['balances']], ['30.00', '0.00', '-30.00'])
+        self.assertEqual(len(data['transfers']), 1)
+
+        # Shares are split by the member count, with left-over cents to the lowest ids.
+        GroupMember.objects.filter(group=self.group, user=self.carol).delete()
+        GroupExpense.objects.filter(user=self.bob).update(amount=Decimal('30.01'))
+        GroupMember.objects.create(group=self.group, user=self.carol)
+        self.assertEqual([row['share'] for row in self.client.get(url).data['balances']],
+                         ['40.01', '40.00', '40.00'])
+
+    def test_non_members_get_404(self):
+        outsider = User.objects.create_user(username='outsider')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(f'/api/v1/finance/group/{self.group.id}/settlement/').status_code, 404)
+
+
+class GroupExpenseTotalsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = [User.objects.create_user(username=name) for name in ('alice', 'bob')]
+        cls.group = Group.objects.create(name='Flat', admin=cls.alice)
+        GroupMember.objects.bulk_create([GroupMember(group=cls.group, user=user) for user in (cls.alice, cls.bob)])
+        cls.expense = GroupExpense.objects.create(group=cls.group, user=cls.alice, title='Power', amount=60, description='Power')
+
+    def contribute(self, user, amount, expense_id=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(f'/api/v1/finance/groupexpense/{self.expense.id}/add-contribution/',
+                           {'expense_id': expense_id or self.expense.id, 'group_id': self.group.id, 'amount': amount})
+
+    def test_contributions_update_running_totals(self):
+        self.assertEqual(self.contribute(self.bob, '10.00').status_code, 201)
+        self.contribute(self.bob, '5.50')
+        self.contribute(self.alice, '20.00')
+        self.expense.refresh_from_db()
+        self.assertEqual((self.expense.contributed_total, self.expense.contributor_count), (Decimal('35.50'), 2))
+
+        self.assertEqual(self.contribute(self.bob, '1.00', expense_id=self.expense.id + 100).status_code, 400)
+
+    def test_repair_recomputes_totals(self):
+        GroupExpenseContribution.objects.create(group_expense=self.expense, user=self.bob, amount=7)
+        GroupExpenseContribution.objects.create(group_expense=self.expense, user=self.bob, amount=3)
+        empty = GroupExpense.objects.create(group=self.group, user=self.bob, title='Water', amount=10, description='Water')
+        GroupExpense.objects.filter(pk=empty.pk).update(contributed_total=99, contributor_count=9)
+
+        call_command('repair_group_totals', stdout=io.StringIO())
+        self.assertEqual(
+            list(GroupExpense.objects.order_by('id').values_list('contributed_total', 'contributor_count')),
+            [(10, 1), (0, 0)],
+        )
+
+
+class GroupExpenseListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = [User.objects.create_user(username=name) for name in ('alice', 'bob')]
+        cls.flat = Group.objects.create(name='Flat', admin=cls.alice)
+        cls.trip = Group.objects.create(name='Trip', admin=cls.alice)
+        cls.other = Group.objects.create(name='Other', admin=cls.bob)
+        GroupMember.objects.bulk_create([
+            GroupMember(group=cls.flat, user=cls.alice), GroupMember(group=cls.trip, user=cls.alice),
+            GroupMember(group=cls.other, user=cls.bob),
+        ])
+        for day in range(1, 6):
+            for group in (cls.flat, cls.trip, cls.other):
+                expense = GroupExpense.objects.create(group=group, user=group.admin, title=f'{group.name} {day}', amount=day, description='-')
+                GroupExpense.objects.filter(pk=expense.pk).update(date=timezone.make_aware(datetime(2024, 3, day, 12)))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+        self.url = '/api/v1/finance/groupexpense/'
+
+    def titles(self, response):
+        return [row['title'] for row in response.data['results']]
+
+    def test_lists_only_member_groups_newest_first(self):
+        # Expenses, contributions and no per-row queries however many rows.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(self.titles(response)[:2], ['Trip 5', 'Flat 5'])
+        self.assertNotIn('Other', ' '.join(self.titles(response)))
+
+        other_expense = GroupExpense.objects.filter(group=self.other).first()
+        self.assertEqual(self.client.get(f'{self.url}{other_expense.id}/').status_code, 404)
+        response = self.client.post(self.url, {'group': self.other.id, 'title': 'x', 'amount': '1.00', 'description': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_group_and_date_filters(self):
+        response = self.client.get(self.url, {'group': self.flat.id, 'date_from': '2024-03-02', 'date_to': '2024-03-03'})
+        self.assertEqual(self.titles(response), ['Flat 3', 'Flat 2'])
+        self.assertEqual(self.client.get(self.url, {'group': self.other.id}).data['results'], [])
+        for group in ('flat', '\u00b2'):
+            self.assertEqual(self.client.get(self.url, {'group': group}).status_code, 400)
+
+    def test_cursor_pages(self):
+        response = self.client.get(self.url, {'page_size': 4})
+        seen = self.titles(response)
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += self.titles(response)
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(len(set(seen)), 10)
+
+
+class BatchContributionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol = [User.objects.create_user(username=name) for name in ('alice', 'bob', 'carol')]
+        cls.outsider = User.objects.create_user(username='outsider')
+        cls.group = Group.objects.create(name='Trip', admin=cls.alice)
+        GroupMember.objects.bulk_create([GroupMember(group=cls.group, user=user) for user in (cls.alice, cls.bob, cls.carol)])
+        cls.expense = GroupExpense.objects.create(group=cls.group, user=cls.alice, title='Cabin', amount=100, description='Cabin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+        self.url = f'/api/v1/finance/groupexpense/{self.expense.id}/batch-contributions/'
+
+    def amounts(self):
+        return list(GroupExpenseContribution.objects.order_by('user_id').values_list('user__username', 'amount'))
+
+    def test_equal_split(self):
+        response = self.client.post(self.url, {'split': 'equal'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.amounts(), [('alice', Decimal('33.34')), ('bob', Decimal('33.33')), ('carol', Decimal('33.33'))])
+        self.assertEqual((response.json()['contributed_total'], response.json()['contributor_count']), ('100.00', 3))
+
+    def test_percentage_split_and_explicit_list(self):
+        shares = [{'user': self.bob.id, 'percent': '70'}, {'user': self.carol.id, 'percent': '30'}]
+        self.client.post(self.url, {'split': 'percentage', 'amount': '50.00', 'shares': shares}, format='json')
+        self.assertEqual(self.amounts(), [('bob', 35), ('carol', 15)])
+
+        contributions = [{'user': self.bob.id, 'amount': '5.00'}, {'user': self.alice.id, 'amount': '2.50'}]
+        # Constant in the number of contributions: membership, lock, earlier contributors, insert, update.
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, {'contributions': contributions}, format='json')
+        self.assertEqual(len(response.data['contributions']), 2)
+        self.expense.refresh_from_db()
+        self.assertEqual((self.expense.contributed_total, self.expense.contributor_count), (Decimal('57.50'), 3))
+
+    def test_rejects_invalid_batches_without_writing(self):
+        bad = [
+            {'split': 'equal', 'users': [self.bob.id, self.outsider.id]},
+            {'split': 'percentage', 'shares': [{'user': self.bob.id, 'percent': '60'}]},
+            {'split': 'equal', 'contributions': [{'user': self.bob.id, 'amount': '1.00'}]},
+            {},
+        ]
+        for payload in bad:
+            self.assertEqual(self.client.post(self.url, payload, format='json').status_code, 400, payload)
+
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.post(self.url, {'split': 'equal'}, format='json').status_code, 404)
+        self.assertFalse(GroupExpenseContribution.objects.exists())
+
+
+class GroupChatHistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='chat-admin')
+        cls.other = User.objects.create_user(username='chat-member')
+        cls.group = Group.objects.create(name='Chat', admin=cls.admin)
+        GroupMember.objects.create(group=cls.group, user=cls.admin)
+        GroupMember.objects.create(group=cls.group, user=cls.other)
+        chat = GroupChat.objects.create(group=cls.group)
+        cls.messages = [
+            GroupChatMessage.objects.create(group_chat=chat, user=cls.admin if i % 2 else cls.other, message=f'Message {i}')
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = f'/api/v1/groupchats/{self.group.id}/chat/'
+
+    def test_latest_page_and_before_cursor(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'limit': 5})
+        self.assertEqual([m['message'] for m in response.data['results']], [f'Message {i}' for i in range(7, 12)])
+        self.assertEqual(response.data['results'][0]['username'], 'chat-admin')
+        self.assertTrue(response.data['has_more'])
+
+        response = self.client.get(self.url, {'limit': 5, 'before': response.data['before']})
+        self.assertEqual([m['message'] for m in response.data['results']], [f'Message {i}' for i in range(2, 7)])
+
+    def test_since_returns_only_new_messages(self):
+        last_seen = self.messages[-3].id
+        response = self.client.get(self.url, {'since': last_seen})
+        self.assertEqual([m['message'] for m in response.data['results']], ['Message 10', 'Message 11'])
+        self.assertFalse(response.data['has_more'])
+
+        response = self.client.get(self.url, {'since': response.data['after']})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['after'], self.messages[-1].id)
+
+    def test_non_member_is_forbidden(self):
+        self.client.force_authenticate(User.objects.create_user(username='outsider'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_post_survives_a_broken_channel_layer(self):
+        layer = mock.Mock(group_send=mock.AsyncMock(side_effect=ConnectionError('redis down')))
+        with mock.patch('api.consumers.get_channel_layer', return_value=layer), self.assertLogs('api.consumers', 'ERROR'):
+            response = self.client.post(self.url, {'message': 'still saved'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(GroupChatMessage.objects.filter(message='still saved').exists())
+
+
+class GroupChatWebSocketTests(TransactionTestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='ws-admin')
+        self.member = User.objects.create_user(username='ws-member')
+        self.group = Group.objects.create(name='Live', admin=self.admin)
+        GroupMember.objects.create(group=self.group, user=self.admin)
+        GroupMember.objects.create(group=self.group, user=self.member)
+        GroupChat.objects.create(group=self.group)
+
+    def connect(self, user):
+        token = AccessToken.for_user(user)
+        return WebsocketCommunicator(
+            application,
+            f'/ws/groupchats/{self.group.id}/chat/?token={token}',
+            headers=[(b'origin', b'http://testserver')],
+        )
+
+    async def test_messages_are_pushed_to_members(self):
+        admin_socket = self.connect(self.admin)
+        member_socket = self.connect(self.member)
+        self.assertTrue((await admin_socket.connect())[0])
+        self.assertTrue((await member_socket.connect())[0])
+
+        await admin_socket.send_json_to({'message': 'hello'})
+        for socket in (admin_socket, member_socket):
+            pushed = await socket.receive_json_from()
+            self.assertEqual(pushed['message'], 'hello')
+            self.assertEqual(pushed['username'], 'ws-admin')
+
+        await admin_socket.disconnect()
+        await member_socket.disconnect()
+
+    async def test_rest_posts_are_broadcast(self):
+        socket = self.connect(self.member)
+        self.assertTrue((await socket.connect())[0])
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = await sync_to_async(client.post)(f'/api/v1/groupchats/{self.group.id}/chat/', {'message': 'via rest'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((await socket.receive_json_from())['message'], 'via rest')
+        await socket.disconnect()
+
+    async def test_non_members_and_anonymous_are_rejected(self):
+        outsider = await sync_to_async(User.objects.create_user)(username='ws-outsider')
+        connected, _ = await self.connect(outsider).connect()
+        self.assertFalse(connected)
+
+        anonymous = WebsocketCommunicator(application, f'/ws/groupchats/{self.group.id}/chat/', headers=[(b'origin', b'http://testserver')])
+        connected, _ = await anonymous.connect()
+        self.assertFalse(connected)
+
+
+class SpendingRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='rollup')
+        cls.food = Category.objects.create(user=cls.user, name='Food')
+        cls.rent = Category.objects.create(user=cls.user, name='Rent')
+        cls.salary = IncomeSource.objects.create(user=cls.user, source_name='Salary')
+        Budget.objects.create(user=cls.user, name='Monthly', period='monthly')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def snapshot(self):
+        return list(
+            SpendingRollup.objects.filter(user=self.user)
+            .exclude(income_count=0, expense_count=0)
+            .order_by('day', 'category_id', 'source_id')
+            .values_list('day', 'category_id', 'source_id', 'income_total', 'expense_total', 'income_count', 'expense_count')
+        )
+
+    def test_rollups_follow_ledger_writes(self):
+        self.client.post('/api/v1/finance/income/', {'source': self.salary.id, 'amount': '1000.00', 'description': 'Pay', 'date': '2024-03-01'})
+        first = self.client.post('/api/v1/finance/expense/', {'category': self.food.id, 'amount': '20.00', 'description': 'Lunch', 'date': '2024-03-01'}).data
+        self.client.post('/api/v1/finance/expense/', {'category': self.food.id, 'amount': '15.50', 'description': 'Dinner', 'date': '2024-03-01'})
+        second = self.client.post('/api/v1/finance/expense/', {'category': self.rent.id, 'amount': '500.00', 'description': 'Rent', 'date': '2024-03-02'}).data
+
+        self.client.patch(f"/api/v1/finance/expense/{first['id']}/", {'category': self.rent.id, 'amount': '25.00', 'date': '2024-03-05'})
+        self.client.delete(f"/api/v1/finance/expense/{second['id']}/")
+
+        incremental = self.snapshot()
+        rebuild_rollups([self.user.id])
+        self.assertEqual(incremental, self.snapshot())
+
+        # Money goes out as fixed-point strings, like every model serializer.
+        month = self.client.get('/api/v1/finance/summary/', {'group_by': 'month'}).json()
+        self.assertEqual(len(month), 1)
+        self.assertEqual((month[0]['income'], month[0]['expenses'], month[0]['net']), ('1000.00', '40.50', '959.50'))
+
+        categories = self.client.get('/api/v1/finance/summary/', {'group_by': 'category'}).json()
+        self.assertEqual([(row['category_name'], row['expenses']) for row in categories], [('Rent', '25.00'), ('Food', '15.50')])
+        sources = self.client.get('/api/v1/finance/summary/', {'group_by': 'source'}).json()
+        self.assertEqual([(row['source_name'], row['income'], row['income_count']) for row in sources], [('Salary', '1000.00', 1)])
+
+        response = self.client.get('/api/v1/finance/summary/', {'group_by': 'day', 'date_from': '2024-03-02'})
+        self.assertEqual([str(row['period']) for row in response.data], ['2024-03-05'])
+
+    def test_deleting_a_category_cascades_cleanly(self):
+        Expense.objects.create(user=self.user, category=self.food, amount=5, description='Snack', date=date(2024, 3, 1))
+        self.food.delete()
+        self.assertFalse(SpendingRollup.objects.filter(user=self.user, category__isnull=False).exists())
+
+
+class AnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='analytics')
+        food = Category.objects.create(user=cls.user, name='Food')
+        rent = Category.objects.create(user=cls.user, name='Rent')
+        salary = IncomeSource.objects.create(user=cls.user, source_name='Salary')
+        Income.objects.create(user=cls.user, source=salary, amount=1000, description='Pay', date=date(2024, 1, 31))
+        Income.objects.create(user=cls.user, source=salary, amount=1200, description='Pay', date=date(2024, 2, 29))
+        Expense.objects.create(user=cls.user, category=rent, amount=600, description='Landlord', date=date(2024, 1, 1))
+        Expense.objects.create(user=cls.user, category=food, amount=70, description='Market', date=date(2024, 2, 1))
+        Expense.objects.create(user=cls.user, category=food, amount=30, description='Market', date=date(2024, 2, 7))
+        Expense.objects.create(user=cls.user, category=rent, amount=300, description='Landlord', date=date(2024, 2, 8))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_sections(self):
+        with self.assertNumQueries(4):
+            data = self.client.get('/api/v1/finance/analytics/', {'date_from': '2024-01-01', 'date_to': '2024-02-29'}).json()
+
+        self.assertEqual([(row['category_name'], row['total'], row['share']) for row in data['categories']],
+                         [('Rent', '900.00', '0.9000'), ('Food', '100.00', '0.1000')])
+
+        trends = data['trends']
+        self.assertEqual([(row['month'], row['income'], row['expenses'], row['previous_expenses']) for row in trends],
+                         [('2024-01-01', '1000.00', '600.00', None), ('2024-02-01', '1200.00', '400.00', '600.00')])
+        self.assertEqual((trends[1]['expenses_change'], trends[1]['income_change']), ('-33.33', '20.00'))
+
+        rolling = {row['day']: row for row in data['rolling']}
+        self.assertEqual(len(rolling), 60)
+        self.assertEqual(rolling['2024-02-07']['avg_7d'], '14.29')
+        self.assertEqual(rolling['2024-02-08']['avg_7d'], '47.14')
+        self.assertEqual(rolling['2024-01-31']['avg_30d'], '0.00')
+        self.assertEqual(rolling['2024-01-01']['avg_30d'], '20.00')
+
+        self.assertEqual([(row['description'], row['total'], row['count']) for row in data['merchants']],
+                         [('Landlord', '900.00', 2), ('Market', '100.00', 2)])
+
+    def test_section_subset_and_validation(self):
+        data = self.client.get('/api/v1/finance/analytics/', {'sections': 'merchants', 'limit': 1, 'date_from': '2024-01-01'}).data
+        self.assertEqual(set(data), {'date_from', 'date_to', 'merchants'})
+        self.assertEqual(len(data['merchants']), 1)
+
+        response = self.client.get('/api/v1/finance/analytics/', {'sections': 'forecast'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SpendingForecastTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='forecast')
+        cls.food = Category.objects.create(user=cls.user, name='Food')
+        cls.budget = Budget.objects.create(user=cls.user, name='Weekly', period='weekly', budget_limit=50)
+        # Thirteen Saturdays of 70.00 ending on 2024-06-01.
+        Expense.objects.bulk_create([
+            Expense(user=cls.user, category=cls.food, amount=70, description='Market', date=date(2024, 3, 9) + timedelta(weeks=week))
+            for week in range(13)
+        ])
+        rebuild_rollups([cls.user.id])
+
+    def test_projects_weekday_seasonality(self):
+        metrics = compute_spending_forecasts('2024-06-03')
+        self.assertEqual(metrics, {'users': 1, 'forecasts': 2, 'run_date': '2024-06-03'})
+
+        budget = SpendingForecast.objects.get(budget=self.budget)
+        self.assertEqual((budget.period_start, budget.period_end), (date(2024, 6, 3), date(2024, 6, 9)))
+        self.assertEqual((budget.spent, budget.projected_total, budget.daily_rate), (0, 70, 10))
+
+        category = SpendingForecast.objects.get(category=self.food)
+        self.assertEqual((category.period_start, category.period_end), (date(2024, 6, 1), date(2024, 6, 30)))
+        self.assertEqual((category.spent, category.projected_total), (70, 350))
+
+        # Re-running replaces the rows instead of adding to them.
+        compute_spending_forecasts('2024-06-03')
+        self.assertEqual(SpendingForecast.objects.filter(user=self.user).count(), 2)
+
+    def test_endpoint_reads_stored_forecasts(self):
+        compute_spending_forecasts('2024-06-03')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            data = client.get('/api/v1/finance/forecast/').data
+        self.assertEqual([(row['budget_name'], row['is_over_budget']) for row in data['budgets']], [('Weekly', True)])
+        self.assertEqual([(row['category_name'], row['projected_total']) for row in data['categories']], [('Food', '350.00')])
+
+
+class ConcurrentCounterTests(TransactionTestCase):
+    """
+    Parallel writes must all land in the budget and goal counters.
+    """
+    workers = 8
+    requests_per_worker = 5
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='concurrent')
+        self.category = Category.objects.create(user=self.user, name='Food')
+        self.source = IncomeSource.objects.create(user=self.user, source_name='Salary')
+        self.budget = Budget.objects.create(user=self.user, name='Daily', period='daily')
+        self.goal = FinancialGoals.objects.create(user=self.user, name='Car', target_amount=10000, target_date=date(2030, 1, 1))
+
+    def run_in_parallel(self, send):
+        def worker(_):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                return [send(client).status_code for _ in range(self.requests_per_worker)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return [code for codes in executor.map(worker, range(self.workers)) for code in codes]
+
+    def test_parallel_expenses_and_incomes(self):
+        today = localdate().isoformat()
+        codes = self.run_in_parallel(lambda client: client.post('/api/v1/finance/expense/', {
+            'category': self.category.id, 'amount': '1.25', 'description': 'Coffee', 'date': today,
+        }))
+        codes += self.run_in_parallel(lambda client: client.post('/api/v1/finance/income/', {
+            'source': self.source.id, 'amount': '10.00', 'description': 'Tip', 'date': today,
+        }))
+        self.assertEqual(set(codes), {201})
+
+        total = self.workers * self.requests_per_worker
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.total_expenses, Decimal('1.25') * total)
+        self.assertEqual(self.budget.total_income, Decimal('10.00') * total)
+
+    def test_parallel_manual_contributions(self):
+        codes = self.run_in_parallel(lambda client: client.post('/api/v1/goals/manual-contribution/', {
+            'goal_id': self.goal.id, 'amount': '2.50',
+        }))
+        self.assertEqual(set(codes), {200})
+
+        total = self.workers * self.requests_per_worker
+        self.goal.refresh_from_db()
+        self.budget.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal('2.50') * total)
+        self.assertEqual(self.goal.contributions.count(), total)
+        self.assertEqual(self.budget.total_expenses, Decimal('2.50') * total)
+
+
+class TransferToFinancialGoalsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='saver')
+        cls.salary = IncomeSource.objects.create(user=cls.user, source_name='Salary')
+        cls.income = Income.objects.create(user=cls.user, source=cls.salary, amount=100, description='Pay', date=date(2024, 5, 1))
+        Income.objects.create(user=cls.user, source=cls.salary, amount=1000, description='Bonus', date=date(2024, 5, 2))
+
+    def make_goal(self, recurrence, allocated, **kwargs):
+        return FinancialGoals.objects.create(
+            user=self.user, name=f'{recurrence} goal', target_amount=500, allocated_amount=allocated,
+            target_date=date(2030, 1, 1), recurrence=recurrence, income_source=self.salary, **kwargs
+        )
+
+    def test_transfers_in_chunks_once_per_period(self):
+        daily = self.make_goal('daily', 10)
+        weekly = self.make_goal('weekly', 5)
+        too_big = self.make_goal('monthly', 10)
+        one_off = self.make_goal('', 10)
+
+        metrics = transfer_to_financial_goals(run_date='2024-05-10', chunk_size=2)
+        self.assertEqual((metrics['goals'], metrics['transferred'], metrics['chunks']), (3, 2, 2))
+        self.assertEqual(metrics['amount'], '45.00')
+
+        for goal, expected in ((daily, 10), (weekly, 35), (too_big, 0), (one_off, 0)):
+            goal.refresh_from_db()
+            self.assertEqual(goal.current_amount, expected)
+        self.income.refresh_from_db()
+        self.assertEqual(self.income.amount, 55)
+        self.assertEqual(
+            SpendingRollup.objects.get(user=self.user, day=date(2024, 5, 1), source=self.salary).income_total, 55
+        )
+
+        # Same run date again: nothing moves.
+        self.assertEqual(transfer_to_financial_goals(run_date='2024-05-10')['transferred'], 0)
+        self.income.refresh_from_db()
+        self.assertEqual(self.income.amount, 55)
+
+        # The next day only the daily goal transfers again; the weekly one
+        # waits a week.
+        self.assertEqual(transfer_to_financial_goals(run_date='2024-05-11')['transferred'], 1)
+        self.assertEqual(transfer_to_financial_goals(run_date='2024-05-16')['transferred'], 1)
+        Income.objects.filter(pk=self.income.pk).update(amount=100)
+        self.assertEqual(transfer_to_financial_goals(run_date='2024-05-17')['transferred'], 2)
+        weekly.refresh_from_db()
+        self.assertEqual((weekly.current_amount, weekly.last_transfer_date), (70, date(2024, 5, 17)))
+
+    def test_monthly_goals_transfer_once_per_calendar_month(self):
+        monthly = self.make_goal('monthly', 1)
+        runs = ['2024-01-31', '2024-02-15', '2024-02-29', '2024-03-28', '2024-03-29']
+        self.assertEqual([transfer_to_financial_goals(run_date=run)['transferred'] for run in runs], [1, 0, 1, 0, 1])
+        monthly.refresh_from_db()
+        self.assertEqual(monthly.current_amount, 90)
+
+
+class ResetBudgetsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='resetter')
+
+    def make_budget(self, period, last_reset_date):
+        return Budget.objects.create(
+            user=self.user, name=period, period=period, total_income=100, total_expenses=40,
+            last_reset_date=last_reset_date,
+        )
+
+    def test_resets_only_budgets_whose_period_rolled_over(self):
+        # 2024-05-15 is a Wednesday.
+        stale_daily = self.make_budget('daily', date(2024, 5, 14))
+        fresh_daily = self.make_budget('daily', date(2024, 5, 15))
+        stale_weekly = self.make_budget('weekly', date(2024, 5, 12))
+        fresh_weekly = self.make_budget('weekly', date(2024, 5, 13))
+        stale_monthly = self.make_budget('monthly', date(2024, 4, 30))
+        fresh_monthly = self.make_budget('monthly', date(2024, 5, 1))
+
+        self.assertEqual(reset_budgets('2024-05-15'), {'daily': 1, 'weekly': 1, 'monthly': 1})
+
+        for budget in (stale_daily, stale_weekly, stale_monthly):
+            budget.refresh_from_db()
+            self.assertEqual((budget.total_income, budget.total_expenses, budget.last_reset_date), (0, 0, date(2024, 5, 15)))
+        for budget in (fresh_daily, fresh_weekly, fresh_monthly):
+            budget.refresh_from_db()
+            self.assertEqual((budget.total_income, budget.total_expenses), (100, 40))
+
+    def test_listing_budgets_does_not_write(self):
+        self.make_budget('daily', date(2000, 1, 1))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # The page count and the page itself, no UPDATE.
+        with self.assertNumQueries(2):
+            response = client.get('/api/v1/finance/budgets/')
+        self.assertEqual(response.data['results'][0]['total_income'], '100.00')
+
+
+class LedgerImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='importer')
+        cls.food = Category.objects.create(user=cls.user, name='Food')
+        cls.budget = Budget.objects.create(user=cls.user, name='Daily', period='daily')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        return self.client.post('/api/v1/finance/import/', {
+            'file': SimpleUploadedFile(name, content.encode('utf-8')), **data,
+        }, format='multipart')
+
+    def test_csv_import_in_chunks(self):
+        today = localdate().isoformat()
+        lines = ['type,amount,description,date,category,source']
+        lines += [f'expense,2.50,Row {i},{today},Food,' for i in range(600)]
+        lines += ['income,1000.00,Salary,2024-01-31,,Employer']
+        lines += ['expense,abc,Broken,2024-01-31,Food,', 'transfer,1,Unknown,2024-01-31,,']
+
+        # Two name lookups, then a fixed number of statements per 500-row chunk.
+        with self.assertNumQueries(28):
+            response = self.upload('ledger.csv', '\n'.join(lines))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], {'income': 1, 'expense': 600})
+        self.assertEqual([error['line'] for error in response.data['errors']], [603, 604])
+
+        self.assertEqual(Expense.objects.filter(user=self.user, category=self.food).count(), 600)
+        self.assertTrue(Income.objects.filter(user=self.user, source__source_name='Employer').exists())
+        self.budget.refresh_from_db()
+        self.assertEqual((self.budget.total_income, self.budget.total_expenses), (1000, 1500))
+        self.assertEqual(
+            SpendingRollup.objects.get(user=self.user, category=self.food).expense_count, 600
+        )
+
+    def test_jsonl_import_with_default_type(self):
+        content = '\n'.join([
+            json.dumps({'amount': '12.00', 'description': 'Taxi', 'date': '2024-02-01', 'category': 'Travel'}),
+            'not json',
+            json.dumps({'amount': '8.00', 'description': 'Bus', 'date': '2024-02-02', 'category': 'Travel'}),
+            json.dumps({'type': 1, 'amount': '3.00', 'description': 'Odd', 'date': '2024-02-03', 'category': 'Travel'}),
+        ])
+        response = self.upload('ledger.jsonl', content, type='expense')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], {'income': 0, 'expense': 2})
+        self.assertEqual([(error['line'], list(error['errors'])) for error in response.data['errors']],
+                         [(2, ['non_field_errors']), (4, ['type'])])
+        self.assertEqual(Category.objects.filter(user=self.user, name='Travel').count(), 1)
+
+
+    def test_undecodable_or_malformed_files_are_rejected(self):
+        latin1 = 'type,amount,description,date,category\nexpense,3.00,Caf\xe9,2024-01-31,Food\n'
+        response = self.client.post('/api/v1/finance/import/', {
+            'file': SimpleUploadedFile('bank.csv', latin1.encode('latin-1')),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['file'], ['File must be UTF-8 encoded.'])
+
+        oversized = 'x' * (csv.field_size_limit() + 1)
+        response = self.upload('ledger.csv', f'type,amount,description,date,category\nexpense,1.00,{oversized},2024-01-31,Food\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Malformed CSV', response.data['file'][0])
+        self.assertFalse(Expense.objects.exists())
+
+
+class LedgerExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='exporter')
+        source = IncomeSource.objects.create(user=cls.user, source_name='Salary')
+        category = Category.objects.create(user=cls.user, name='Food')
+        Income.objects.create(user=cls.user, source=source, amount=1000, description='Pay', date=date(2024, 1, 31))
+        Expense.objects.create(user=cls.user, category=category, amount=12, description='Lunch, with tip', date=date(2024, 2, 1))
+        Expense.objects.create(user=cls.user, category=category, amount=5, description='Old', date=date(2023, 12, 1))
+        goal = FinancialGoals.objects.create(user=cls.user, name='Car', target_amount=100, target_date=date(2030, 1, 1))
+        FinancialGoalContribution.objects.create(goal=goal, user=cls.user, amount=25)
+        group = Group.objects.create(name='Trip', admin=cls.user)
+        expense = GroupExpense.objects.create(group=group, user=cls.user, title='Hotel', amount=90, description='Hotel')
+        GroupExpenseContribution.objects.create(group_expense=expense, user=cls.user, amount=30)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_csv_export(self):
+        response = self.client.get('/api/v1/finance/export/')
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['record_type'] for row in rows], ['income', 'expense', 'expense', 'goal_contribution', 'group_contribution'])
+        self.assertEqual(rows[2]['description'], 'Lunch, with tip')
+        self.assertEqual(rows[4]['group'], 'Trip')
+
+    def test_jsonl_export_with_date_range(self):
+        response = self.client.get('/api/v1/finance/export/', {'file_format': 'jsonl', 'date_from': '2024-01-01', 'date_to': '2024-01-31'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(record['record_type'], record['amount']) for record in records], [('income', '1000.00')])
+
+
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cached')
+        Category.objects.create(user=cls.user, name='Food')
+        Budget.objects.create(user=cls.user, name='Daily', period='daily')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeat_reads_are_served_from_cache_with_etag(self):
+        first = self.client.get('/api/v1/finance/category/')
+        self.assertIn('ETag', first)
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/v1/finance/category/')
+        self.assertEqual(second.data, first.data)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/v1/finance/category/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+
+    def test_writes_invalidate_only_the_owner(self):
+        other = User.objects.create_user(username='other-cached')
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        etag = self.client.get('/api/v1/finance/category/')['ETag']
+        other_client.get('/api/v1/finance/category/')
+
+        self.client.post('/api/v1/finance/category/', {'name': 'Travel'})
+        response = self.client.get('/api/v1/finance/category/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+        with self.assertNumQueries(0):
+            other_client.get('/api/v1/finance/category/')
+
+    def test_budget_increments_invalidate_budgets(self):
+        budget = Budget.objects.get(user=self.user)
+        stamp = budget.updated_at
+        self.client.get('/api/v1/finance/budgets/')
+        budget.add_expense(Decimal('12.50'))
+        budget.add_income(5)
+        self.assertGreater(budget.updated_at, stamp)
+        row = self.client.get('/api/v1/finance/budgets/').data['results'][0]
+        self.assertEqual((row['total_income'], row['total_expenses']), ('5.00', '12.50'))
+
+    def test_budget_counter_updates_invalidate_budgets(self):
+        self.assertEqual(self.client.get('/api/v1/finance/budgets/').data['results'][0]['total_income'], '0.00')
+        source = IncomeSource.objects.create(user=self.user, source_name='Salary')
+        self.client.post('/api/v1/finance/income/', {'source': source.id, 'amount': '50.00', 'description': 'Pay', 'date': '2024-01-01'})
+        self.assertEqual(self.client.get('/api/v1/finance/budgets/').data['results'][0]['total_income'], '50.00')
+
+
+class DatabaseHealthTests(TestCase):
+
+    def test_reports_sqlite_settings_to_staff(self):
+        response = APIClient().get('/api/v1/health/db/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'status', 'vendor', 'latency_ms'})
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='ops', is_staff=True))
+        response = client.get('/api/v1/health/db/')
+        self.assertEqual(response.data['status'], 'ok')
+        self.assertEqual(response.data['sqlite']['journal_mode'], 'wal')
+        self.assertEqual(response.data['sqlite']['synchronous'], 1)
+
+    def test_failures_do_not_leak_driver_messages(self):
+        error = DatabaseError('could not connect to server at db.internal:5432')
+        with mock.patch('api.views.main.health_views.database_status', side_effect=error), \
+                self.assertLogs('api.views.main.health_views', 'ERROR'):
+            response = APIClient().get('/api/v1/health/db/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data, {'status': 'error', 'detail': 'Database unavailable.'})
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.user = User.objects.create_user(username='metrics')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get('/api/v1/transactions/')
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+
+        with override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape-secret'):
+            metrics = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(metrics.status_code, 200)
+        body = metrics.content.decode()
+        self.assertIn('http_requests_total{route="transactions",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_db_queries_count{route="transactions",method="GET"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="transactions",method="GET",le="+Inf"} 1', body)
+
+    def test_metrics_are_off_by_default_and_restricted(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with override_settings(METRICS_ENABLED=True, METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+            self.client.force_login(User.objects.create_user(username='metrics-staff', is_staff=True))
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+        with override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    @override_settings(REQUEST_QUERY_BUDGET=0)
+    def test_logs_requests_over_budget(self):
+        with self.assertLogs('api.middleware', level='WARNING') as logs:
+            self.client.get('/api/v1/finance/income/')
+        self.assertIn('Request over budget: GET /api/v1/finance/income/ (income-list)', logs.output[0])
+
+
+class SeedDataTests(TestCase):
+
+    def test_seeds_every_resource_and_rollups(self):
+        call_command('seed_data', users=3, rows=20, seed=7, password='Seed-pa55', stdout=io.StringIO())
+
+        users = User.objects.filter(username__startswith='seed-7-').order_by('id')
+        self.assertEqual(users.count(), 3)
+        self.assertTrue(users[0].check_password('Seed-pa55'))
+        self.assertEqual(Income.objects.filter(user__in=users).count() + Expense.objects.filter(user__in=users).count(), 60)
+        self.assertEqual(Budget.objects.filter(user__in=users).count(), 3)
+        self.assertTrue(GroupExpenseContribution.objects.filter(group_expense__group__admin=users[0]).exists())
+        self.assertEqual(
+            sum(SpendingRollup.objects.filter(user__in=users).values_list('expense_count', flat=True)),
+            Expense.objects.filter(user__in=users).count(),
+        )
+
+
+class RecordingNotifier(BaseNotifier):
+    sent = []
+    failing = set()
+
+    def send_bill_reminders(self, user, bills):
+        if user.username in self.failing:
+            raise ConnectionError('unreachable')
+        self.sent.append((user.username, sorted(bill.bill_name for bill in bills)))
+
+
+@override_settings(NOTIFICATION_BACKEND='api.tests.RecordingNotifier')
+class BillReminderDispatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice')
+        cls.bob = User.objects.create_user(username='bob')
+        cls.carol = User.objects.create_user(username='carol')
+
+        def bill(user, name, due_date, reminder_time=3, **kwargs):
+            return BillReminder.objects.create(user=user, bill_name=name, amount=10, category='Utilities',
+                                               due_date=due_date, reminder_time=reminder_time, **kwargs)
+
+        cls.water = bill(cls.alice, 'Water', date(2024, 5, 13))
+        bill(cls.alice, 'Power', date(2024, 5, 11), reminder_time=1)
+        bill(cls.alice, 'Phone', date(2024, 5, 13), is_paid=True)
+        bill(cls.alice, 'Gym', date(2024, 5, 14))
+        bill(cls.bob, 'Rent', date(2024, 5, 10), reminder_time=0)
+        bill(cls.carol, 'Internet', date(2024, 5, 12), reminder_time=2)
+
+    def setUp(self):
+        RecordingNotifier.sent = []
+        RecordingNotifier.failing = set()
+
+    def test_remind_on_follows_due_date(self):
+        self.assertEqual(self.water.remind_on, date(2024, 5, 10))
+        self.water.reminder_sent_on = date(2024, 5, 10)
+        self.water.due_date = date(2024, 5, 20)
+        self.water.save(update_fields=['due_date'])
+        self.water.refresh_from_db()
+        self.assertEqual((self.water.remind_on, self.water.reminder_sent_on), (date(2024, 5, 17), None))
+
+    def test_one_notification_per_user_and_idempotent(self):
+        RecordingNotifier.failing = {'carol'}
+        with self.assertLogs('api.tasks', level='ERROR'):
+            metrics = send_bill_reminders('2024-05-10', chunk_size=2)
+        self.assertEqual(metrics, {'run_date': '2024-05-10', 'users': 2, 'bills': 3, 'failed_users': 1})
+        self.assertEqual(RecordingNotifier.sent, [('alice', ['Power', 'Water']), ('bob', ['Rent'])])
+        self.assertEqual(BillReminder.objects.filter(reminder_sent_on=date(2024, 5, 10)).count(), 3)
+
+        # Only the failed delivery is retried.
+        RecordingNotifier.sent, RecordingNotifier.failing = [], set()
+        send_bill_reminders('2024-05-10')
+        self.assertEqual(RecordingNotifier.sent, [('carol', ['Internet'])])
+
+    def test_file_notifier(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'notifications.jsonl')
+        FileNotifier(path).send_bill_reminders(self.alice, [self.water])
+        with open(path) as fh:
+            self.assertEqual(json.loads(fh.read())['bills'][0]['bill_name'], 'Water')
+
+
+class RecurringBillTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='recurring')
+
+    def test_calendar_arithmetic(self):
+        self.assertEqual(list(occurrences(date(2024, 1, 31), 'monthly', date(2024, 4, 30))),
+                         [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)])
+        self.assertEqual(next_due_date(date(2024, 12, 15), 'monthly'), date(2025, 1, 15))
+        self.assertEqual(next_due_date(date(2024, 11, 30), 'quarterly'), date(2025, 2, 28))
+        self.assertEqual(next_due_date(date(2025, 2, 28), 'quarterly', anchor_day=30), date(2025, 5, 30))
+        self.assertEqual(next_due_date(date(2024, 2, 29), 'yearly'), date(2025, 2, 28))
+        self.assertEqual(next_due_date(date(2024, 12, 30), 'weekly'), date(2025, 1, 6))
+        self.assertIsNone(next_due_date(date(2024, 1, 1), 'one_time'))
+
+    def test_generate_is_idempotent(self):
+        rent = BillReminder.objects.create(user=self.user, bill_name='Rent', amount=900, category='Housing',
+                                           due_date=date(2024, 1, 31), recurring_interval='monthly', reminder_time=3)
+        BillReminder.objects.create(user=self.user, bill_name='Repair', amount=80, category='Housing',
+                                    due_date=date(2024, 1, 31), recurring_interval='one_time', reminder_time=3)
+
+        with self.assertNumQueries(4):
+            metrics = generate_recurring_bills('2024-02-01', horizon_days=60)
+        self.assertEqual(metrics, {'run_date': '2024-02-01', 'series': 1, 'occurrences': 2})
+        self.assertEqual(list(rent.occurrences.values_list('due_date', 'remind_on', 'is_paid')),
+                         [(date(2024, 2, 29), date(2024, 2, 26), False), (date(2024, 3, 31), date(2024, 3, 28), False)])
+
+        self.assertEqual(generate_recurring_bills('2024-02-01', horizon_days=60)['occurrences'], 0)
+        generate_recurring_bills('2024-03-01', horizon_days=60)
+        self.assertEqual([bill.due_date for bill in rent.occurrences.all()], [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)])
+
+    def test_paying_reuses_generated_occurrence(self):
+        rent = BillReminder.objects.create(user=self.user, bill_name='Rent', amount=900, category='Housing',
+                                           due_date=date(2024, 1, 31), recurring_interval='monthly', reminder_time=3)
+        generate_recurring_bills('2024-01-15', horizon_days=45)
+        february = rent.occurrences.get()
+
+        self.assertEqual(rent.create_recurring_bill(), february)
+        march = february.create_recurring_bill()
+        self.assertEqual((march.due_date, march.series_id, march.remind_on), (date(2024, 3, 31), rent.id, date(2024, 3, 28)))
+        self.assertEqual(rent.occurrences.count(), 2)
+
+    def make_bill(self, due_date, **fields):
+        return BillReminder.objects.create(**{
+            'user': self.user, 'bill_name': 'Rent', 'amount': 900, 'category': 'Housing',
+            'due_date': due_date, 'recurring_interval': 'monthly', 'reminder_time': 3, **fields,
+        })
+
+    def test_generate_skips_missed_dates(self):
+        rent = self.make_bill(date(2020, 1, 31), is_paid=True)
+        self.assertEqual(generate_recurring_bills('2024-03-01', horizon_days=60)['occurrences'], 2)
+        self.assertEqual([bill.due_date for bill in rent.occurrences.all()], [date(2024, 3, 31), date(2024, 4, 30)])
+
+    def test_deleting_first_bill_keeps_upcoming_ones(self):
+        rent = self.make_bill(date(2024, 1, 15), is_paid=True)
+        generate_recurring_bills('2024-01-20', horizon_days=60)
+        february, march = rent.occurrences.all()
+
+        rent.delete()
+        february.refresh_from_db()
+        self.assertIsNone(february.series_id)
+        self.assertEqual(list(february.occurrences.all()), [march])
+        self.assertEqual(generate_recurring_bills('2024-01-20', horizon_days=60)['occurrences'], 0)
+
+        BillReminder.objects.filter(pk__in=[february.pk, march.pk]).delete()
+        self.assertFalse(BillReminder.objects.exists())
+
+    def test_migration_links_existing_chains(self):
+        october = self.make_bill(date(2024, 10, 1), is_paid=True)
+        november = self.make_bill(date(2024, 11, 1))
+        copy = self.make_bill(date(2024, 11, 1))
+        other = self.make_bill(date(2024, 11, 1), amount=50)
+
+        import_module('api.migrations.0027_bill_series_links').link_bill_series(django_apps, None)
+        self.assertEqual(list(october.occurrences.all()), [november])
+        # Same day as a linked bill: kept, as the first bill of its own series.
+        copy.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((copy.series_id, other.series_id), (None, None))
+
+        generate_recurring_bills('2024-11-10', horizon_days=30)
+        self.assertEqual([bill.due_date for bill in october.occurrences.all()], [date(2024, 11, 1), date(2024, 12, 1)])
+        self.assertEqual(BillReminder.objects.filter(series=october, due_date=date(2024, 12, 1)).count(), 1)
+        # October's chain, the kept copy and the 50.00 bill each get one December bill.
+        self.assertEqual(BillReminder.objects.filter(due_date=date(2024, 12, 1)).count(), 3)
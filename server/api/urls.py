@@ -1,5 +1,6 @@
 from django.urls import path, include
-from .views.main.main_views import IncomeSourceView, IncomeView, CategoryView, ExpenseView, TransactionsView, FinancialGoalView, ManualContributionView, GroupViewSet, GroupExpenseViewSet, BudgetViewSet, BillReminderViewSet, GroupChatView
+from .views.main.main_views import IncomeSourceView, IncomeView, CategoryView, ExpenseView, TransactionsView, SpendingSummaryView, AnalyticsView, SpendingForecastView, LedgerImportView, LedgerExportView, FinancialGoalView, ManualContributionView, GroupViewSet, GroupExpenseViewSet, BudgetViewSet, BillReminderViewSet, GroupChatView
+from .views.main.health_views import DatabaseHealthView
 from .views.Auth.auth_view import UserRegistrationView, UserLoginView, LogoutView, PasswordChangeView
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -31,6 +32,14 @@ urlpatterns = [
     # Income AP
     path('goals/manual-contribution/', ManualContributionView.as_view(), name='manual-contribution'),
     path('transactions/', TransactionsView.as_view(), name='transactions'),
+    path('finance/summary/', SpendingSummaryView.as_view(), name='spending-summary'),
+    path('finance/analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('finance/forecast/', SpendingForecastView.as_view(), name='spending-forecast'),
+    path('finance/import/', LedgerImportView.as_view(), name='ledger-import'),
+    path('finance/export/', LedgerExportView.as_view(), name='ledger-export'),
     path('groupchats/<int:group_id>/chat/', GroupChatView.as_view(), name='group-chat'),
     path('finance/', include(router.urls)),
+
+    # Operations
+    path('health/db/', DatabaseHealthView.as_view(), name='health-db'),
 ]
@@ -0,0 +1,53 @@
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ...db import database_status
+from ...metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseHealthView(APIView):
+    """
+    Database health for load balancers and dashboards. Anyone gets the status
+    and round-trip latency; staff also get connection settings, pool usage
+    and SQLite PRAGMAs. Returns 503 when the database is down.
+    """
+    permission_classes = [AllowAny]
+    public_fields = ('status', 'vendor', 'latency_ms')
+
+    def get(self, request):
+        try:
+            data = dict(database_status(), status='ok')
+        except DatabaseError:
+            # Driver messages name hosts and databases; they stay in the logs.
+            logger.exception("Database health check failed")
+            return Response({'status': 'error', 'detail': 'Database unavailable.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if not request.user.is_staff:
+            data = {field: data[field] for field in self.public_fields}
+        return Response(data)
+
+
+def metrics_view(request):
+    """
+    Request metrics in the Prometheus text exposition format.
+
+    Returns 404 unless METRICS_ENABLED is set, and 403 unless the caller is
+    logged in as staff or sends METRICS_TOKEN as a bearer token.
+    """
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    has_token = bool(token) and constant_time_compare(authorization, f'Bearer {token}')
+    if not (has_token or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,42 +1,78 @@
 from genericpath import exists
 from rest_framework import viewsets
 from rest_framework.response import Response
-from ...models import IncomeSource, Income, Category, Expense, FinancialGoals, Group, GroupMember, GroupExpense, FinancialGoalContribution, Budget, BillReminder
-from .serializer import IncomeSourceSerializer, IncomeSerializer, CatagorySerilaizer, ExpenseSerializer, FinancialGoalSerializer, ManualContributionSerializer, GroupSerializer, AddMemberSerializer, GroupExpenseSerializer, GroupExpenseContributionSerializer, BudgetSerializer, BillReminderSerializer
+from ...models import IncomeSource, Income, Category, Expense, SpendingRollup, SpendingForecast, FinancialGoals, Group, GroupMember, GroupExpense, FinancialGoalContribution, Budget, BillReminder
+from ...analytics import category_totals, monthly_trends, rolling_averages, top_merchants
+from ...budgets import adjust_budget_totals
+from ...cache import CachedResponseMixin, get_or_compute
+from ...exports import EXPORT_FORMATS, ledger_records, stream_csv, stream_jsonl
+from ...imports import IMPORT_FORMATS, LedgerImporter, iter_rows
+from ...pagination import GroupExpensePagination, TimeOrderedCursorPagination
+from ...settlement import settle_group
+from .serializer import IncomeSourceSerializer, IncomeSerializer, CatagorySerilaizer, ExpenseSerializer, FinancialGoalSerializer, ManualContributionSerializer, GroupSerializer, AddMemberSerializer, GroupExpenseSerializer, GroupExpenseContributionSerializer, BatchContributionSerializer, BudgetSerializer, BillReminderSerializer, SpendingForecastSerializer, SpendingPeriodSerializer, SpendingByCategorySerializer, SpendingBySourceSerializer, CategoryTotalSerializer, MonthlyTrendSerializer, RollingAverageSerializer, MerchantTotalSerializer, GroupSettlementSerializer, BatchContributionResultSerializer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
-from itertools import chain
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework import serializers
+from django.utils import timezone
 from django.utils.timezone import localdate
 from decimal import Decimal
-from datetime import date
+from datetime import date, datetime, timedelta
 from django.utils.timezone import localdate
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import CharField, F, Prefetch, Q, Sum, Value
+from django.db.models.functions import Trunc
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.utils.urls import replace_query_param
+from base64 import b64decode, b64encode
+import csv
+import json
 
 User = get_user_model()
 
-class IncomeSourceView(viewsets.ModelViewSet):
+
+def date_range_filters(params, field='date'):
+    """
+    Lookups for the optional ``date_from``/``date_to`` query params (inclusive).
+    """
+    filters = {}
+    for param, lookup in (('date_from', 'gte'), ('date_to', 'lte')):
+        value = params.get(param)
+        if not value:
+            continue
+        parsed = parse_date(value)
+        if parsed is None:
+            raise serializers.ValidationError({param: 'Date has wrong format. Use YYYY-MM-DD.'})
+        filters[f'{field}__{lookup}'] = parsed
+    return filters
+
+class IncomeSourceView(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = IncomeSource.objects.all()
     serializer_class = IncomeSourceSerializer
     permission_classes = [IsAuthenticated]
+    cache_scope = 'source'
 
     def get_queryset(self):
-        return IncomeSource.objects.filter(user=self.request.user)
+        return IncomeSource.objects.filter(user=self.request.user).order_by('source_name', 'id')
 
     def perform_create(self, serializer):
         serializer.save(user = self.request.user)
 
 
 
-class CategoryView(viewsets.ModelViewSet):
+class CategoryView(CachedResponseMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Category.objects.all()
     serializer_class = CatagorySerilaizer
+    cache_scope = 'category'
 
     def get_queryset(self):
-        return Category.objects.filter(user = self.request.user)
+        return Category.objects.filter(user = self.request.user).order_by('name', 'id')
     
     def perform_create(self, serializer):
         serializer.save(user = self.request.user)
@@ -46,130 +82,408 @@ class IncomeView(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Income.objects.all()
     serializer_class = IncomeSerializer
+    pagination_class = TimeOrderedCursorPagination
 
     def get_queryset(self):
-        return Income.objects.filter(user=self.request.user)
+        return Income.objects.filter(user=self.request.user).select_related('source')
 
+    @transaction.atomic
     def perform_create(self, serializer):
         source = serializer.validated_data.get('source')
         if source.user != self.request.user:
             raise serializers.ValidationError("You can only add income to your own sources.")
-        
-        # Check if the user has a budget
-        try:
-            budget = Budget.objects.get(user=self.request.user)
-        except Budget.DoesNotExist:
-            # If no budget is found, just save the income without modifying the budget
-            serializer.save(user=self.request.user)
-            return
-
-        # If budget exists, update the total_income
-        amount = serializer.validated_data.get('amount')  # Get amount from validated data
-        budget.total_income += amount
-        budget.save()
-
-        # Save the income after updating the budget
-        serializer.save(user=self.request.user)
+
+        income = serializer.save(user=self.request.user)
+
+        # Add the income to the user's budget, if they have one
+        adjust_budget_totals(self.request.user, income=income.amount)
 
 
 class ExpenseView(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
+    pagination_class = TimeOrderedCursorPagination
 
     def get_queryset(self):
-        return Expense.objects.filter(user=self.request.user)
+        return Expense.objects.filter(user=self.request.user).select_related('category')
 
+    @transaction.atomic
     def perform_create(self, serializer):
         category = serializer.validated_data.get('category')
         if category.user != self.request.user:
             raise serializers.ValidationError("You can only add expenses to your own categories.")
 
-        # Check if the user has a budget
-        try:
-            budget = Budget.objects.get(user=self.request.user)
-        except Budget.DoesNotExist:
-            # If no budget is found, just save the expense without modifying the budget
-            serializer.save(user=self.request.user)
-            return
-
-        # Only update today's budget if the expense date is today
-        amount = serializer.validated_data.get('amount')
-        expense_date = serializer.validated_data.get('date', localdate())  # Default to today if date is not provided
-        if expense_date == localdate():
-            budget.total_expenses += Decimal(amount)
-            budget.save()
-
-        # Save the expense after updating the budget
-        serializer.save(user=self.request.user)
+        expense = serializer.save(user=self.request.user)
 
+        # Only today's expenses count towards the budget
+        if expense.date == localdate():
+            adjust_budget_totals(self.request.user, expenses=expense.amount)
+
+    @transaction.atomic
     def perform_update(self, serializer):
-        # Get the original expense amount and date before updating
-        original_expense = self.get_object()
-        original_amount = original_expense.amount
-        original_date = original_expense.date
+        # The instance still holds the original values until it is saved
+        original_amount = serializer.instance.amount
+        original_date = serializer.instance.date
 
-        # Update the expense
         updated_expense = serializer.save(user=self.request.user)
-        new_amount = updated_expense.amount
-        new_date = updated_expense.date
 
-        # Adjust the budget only if the expense date matches today
-        budget = Budget.objects.get(user=self.request.user)
+        # Adjust the budget only for the parts dated today
         today = localdate()
-        
+        delta = Decimal('0.00')
         if original_date == today:
-            budget.total_expenses -= Decimal(original_amount)
-        if new_date == today:
-            budget.total_expenses += Decimal(new_amount)
-
-        budget.save()
+            delta -= original_amount
+        if updated_expense.date == today:
+            delta += Decimal(updated_expense.amount)
+        adjust_budget_totals(self.request.user, expenses=delta)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         # Adjust the budget's total expenses only if the expense date is today
-        budget = Budget.objects.get(user=self.request.user)
         if instance.date == localdate():
-            budget.total_expenses -= Decimal(instance.amount)
-            budget.save()
+            adjust_budget_totals(self.request.user, expenses=-instance.amount)
 
         # Delete the expense
         instance.delete()
 
 
 class TransactionsView(APIView):
+    """
+    Incomes and expenses merged into one feed, newest first like the other
+    cursor-paged endpoints.
+
+    Both tables are merged in the database with ``UNION ALL`` and paged with a
+    keyset cursor on ``(created_at, id, type)``, so a page costs the same no
+    matter how long the account history is.
+
+    Query params: ``cursor``, ``page_size``, ``ordering`` (``-created_at``,
+    the default, or ``created_at`` for oldest first), ``date_from``,
+    ``date_to``, ``type`` (income/expense), ``category`` (expenses) and
+    ``source`` (incomes).
+    """
+    permission_classes = [IsAuthenticated]
+    page_size = 50
+    max_page_size = 200
+    orderings = ('-created_at', 'created_at')
+
+    def get(self, request):
+        params = request.query_params
+        kind = params.get('type') or None
+        if kind not in (None, 'income', 'expense'):
+            raise serializers.ValidationError({'type': "Must be 'income' or 'expense'."})
+        ordering = params.get('ordering') or self.orderings[0]
+        if ordering not in self.orderings:
+            raise serializers.ValidationError({'ordering': "Must be '-created_at' or 'created_at'."})
+        descending = ordering.startswith('-')
+
+        category = params.get('category')
+        source = params.get('source')
+        for param, value in (('category', category), ('source', source)):
+            if value and not value.isdecimal():
+                raise serializers.ValidationError({param: f'Must be a {param} id.'})
+        # Incomes have no category and expenses have no source, so filtering
+        # on one of them only narrows the other table when both are given.
+        include_income = kind in (None, 'income') and (source or not category)
+        include_expense = kind in (None, 'expense') and (category or not source)
+
+        filters = date_range_filters(params)
+        cursor = self.decode_cursor(params.get('cursor'))
+        page_size = self.get_page_size(params)
+
+        key_querysets = []
+        if include_income:
+            incomes = Income.objects.filter(user=request.user, **filters)
+            if source:
+                incomes = incomes.filter(source_id=source)
+            key_querysets.append(self.get_keys(incomes, 'income', cursor, descending))
+        if include_expense:
+            expenses = Expense.objects.filter(user=request.user, **filters)
+            if category:
+                expenses = expenses.filter(category_id=category)
+            key_querysets.append(self.get_keys(expenses, 'expense', cursor, descending))
+
+        if not key_querysets:
+            return Response({'next': None, 'results': []})
+
+        keys = key_querysets[0]
+        if len(key_querysets) > 1:
+            keys = keys.union(*key_querysets[1:], all=True)
+        key_order = ('created_at', 'id', 'type')
+        if descending:
+            key_order = tuple(f'-{field}' for field in key_order)
+        rows = list(keys.order_by(*key_order)[:page_size + 1])
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        next_url = None
+        if has_more:
+            last = rows[-1]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor',
+                self.encode_cursor(last['created_at'], last['id'], last['type'])
+            )
+
+        return Response({'next': next_url, 'results': self.serialize_rows(rows)})
+
+    def get_keys(self, queryset, kind, cursor, descending=False):
+        if cursor is not None:
+            created_at, pk, cursor_kind = cursor
+            # Rows strictly past the cursor in the requested direction.
+            lookup = 'lt' if descending else 'gt'
+            after = Q(**{f'created_at__{lookup}': created_at}) | Q(created_at=created_at, **{f'id__{lookup}': pk})
+            if (kind < cursor_kind) if descending else (kind > cursor_kind):
+                after |= Q(created_at=created_at, id=pk)
+            queryset = queryset.filter(after)
+        return queryset.annotate(type=Value(kind, output_field=CharField())).values('created_at', 'id', 'type')
+
+    def serialize_rows(self, rows):
+        income_ids = [row['id'] for row in rows if row['type'] == 'income']
+        expense_ids = [row['id'] for row in rows if row['type'] == 'expense']
+
+        serialized = {}
+        if income_ids:
+            for item in IncomeSerializer(Income.objects.filter(id__in=income_ids).select_related('source'), many=True).data:
+                item['type'] = 'income'
+                serialized[('income', item['id'])] = item
+        if expense_ids:
+            for item in ExpenseSerializer(Expense.objects.filter(id__in=expense_ids).select_related('category'), many=True).data:
+                item['type'] = 'expense'
+                serialized[('expense', item['id'])] = item
+
+        return [serialized[(row['type'], row['id'])] for row in rows]
+
+    def get_page_size(self, params):
+        try:
+            page_size = int(params.get('page_size', self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, created_at, pk, kind):
+        payload = json.dumps([created_at.isoformat(), pk, kind])
+        return b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            created_at, pk, kind = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            created_at = datetime.fromisoformat(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        if kind not in ('income', 'expense'):
+            raise NotFound('Invalid cursor')
+        return created_at, pk, kind
+
+
+
+class SpendingSummaryView(APIView):
+    """
+    Income and expense totals read from the pre-aggregated ``SpendingRollup``
+    rows instead of scanning the ledger.
+
+    ``group_by`` is one of ``day``, ``week``, ``month`` (default),
+    ``category`` or ``source``; ``date_from``/``date_to`` limit the range.
+    """
     permission_classes = [IsAuthenticated]
+    periods = ('day', 'week', 'month')
 
     def get(self, request):
-        incomes = Income.objects.filter(user=request.user).order_by('created_at')
-        expenses = Expense.objects.filter(user=request.user).order_by('created_at')
+        group_by = request.query_params.get('group_by', 'month')
+        rollups = SpendingRollup.objects.filter(user=request.user, **date_range_filters(request.query_params, 'day'))
+
+        if group_by == 'category':
+            rows = (
+                rollups.filter(category__isnull=False)
+                .values('category_id', 'category__name')
+                .annotate(expenses=Sum('expense_total'), expense_count=Sum('expense_count'))
+                .order_by('-expenses')
+            )
+            return Response(SpendingByCategorySerializer([
+                {'category': row['category_id'], 'category_name': row['category__name'],
+                 'expenses': row['expenses'], 'expense_count': row['expense_count']}
+                for row in rows
+            ], many=True).data)
+
+        if group_by == 'source':
+            rows = (
+                rollups.filter(source__isnull=False)
+                .values('source_id', 'source__source_name')
+                .annotate(income=Sum('income_total'), income_count=Sum('income_count'))
+                .order_by('-income')
+            )
+            return Response(SpendingBySourceSerializer([
+                {'source': row['source_id'], 'source_name': row['source__source_name'],
+                 'income': row['income'], 'income_count': row['income_count']}
+                for row in rows
+            ], many=True).data)
+
+        if group_by not in self.periods:
+            raise serializers.ValidationError({'group_by': 'Must be one of day, week, month, category or source.'})
+
+        rows = (
+            rollups.annotate(period=Trunc('day', group_by))
+            .values('period')
+            .annotate(
+                income=Sum('income_total'), expenses=Sum('expense_total'),
+                income_count=Sum('income_count'), expense_count=Sum('expense_count'),
+            )
+            .order_by('period')
+        )
+        return Response(SpendingPeriodSerializer([dict(row, net=row['income'] - row['expenses']) for row in rows], many=True).data)
+
+
+class AnalyticsView(APIView):
+    """
+    Spending analytics aggregated in the database: ``categories`` (total and
+    share per category), ``trends`` (month-over-month income and expenses),
+    ``rolling`` (7 and 30-day moving averages of daily expenses) and
+    ``merchants`` (top ``limit`` expense descriptions).
+
+    ``date_from``/``date_to`` default to the last year; ``sections`` picks a
+    comma-separated subset.
+    """
+    permission_classes = [IsAuthenticated]
+    sections = ('categories', 'trends', 'rolling', 'merchants')
+    default_days = 365
+    merchant_limit = 10
+    max_merchant_limit = 100
 
-        income_data = IncomeSerializer(incomes, many=True).data
-        expense_data = ExpenseSerializer(expenses, many=True).data
+    def get(self, request):
+        params = request.query_params
+        dates = date_range_filters(params)
+        date_to = dates.get('date__lte') or localdate()
+        date_from = dates.get('date__gte') or date_to - timedelta(days=self.default_days - 1)
+        if date_from > date_to:
+            raise serializers.ValidationError({'date_from': 'Must not be after date_to.'})
+
+        sections = params.get('sections', ','.join(self.sections)).split(',')
+        unknown = set(sections) - set(self.sections)
+        if unknown:
+            raise serializers.ValidationError({'sections': f"Unknown sections: {', '.join(sorted(unknown))}."})
+
+        rollups = SpendingRollup.objects.filter(user=request.user)
+        in_range = rollups.filter(day__gte=date_from, day__lte=date_to)
+        data = {'date_from': date_from, 'date_to': date_to}
+        if 'categories' in sections:
+            data['categories'] = CategoryTotalSerializer(category_totals(in_range), many=True).data
+        if 'trends' in sections:
+            data['trends'] = MonthlyTrendSerializer(monthly_trends(in_range), many=True).data
+        if 'rolling' in sections:
+            data['rolling'] = RollingAverageSerializer(rolling_averages(rollups, date_from, date_to), many=True).data
+        if 'merchants' in sections:
+            expenses = Expense.objects.filter(user=request.user, date__gte=date_from, date__lte=date_to)
+            data['merchants'] = MerchantTotalSerializer(top_merchants(expenses, self.get_limit(params)), many=True).data
+        return Response(data)
+
+    def get_limit(self, params):
+        try:
+            limit = int(params.get('limit', self.merchant_limit))
+        except ValueError:
+            raise serializers.ValidationError({'limit': 'Must be an integer.'})
+        return max(1, min(limit, self.max_merchant_limit))
+
+
+class SpendingForecastView(APIView):
+    """
+    The user's latest end-of-period spending forecasts, split into
+    ``budgets`` and ``categories``. They are computed nightly by the
+    ``compute_spending_forecasts`` task, so this only reads stored rows.
+    """
+    permission_classes = [IsAuthenticated]
 
+    def get(self, request):
+        forecasts = (
+            SpendingForecast.objects.filter(user=request.user)
+            .select_related('budget', 'category')
+            .order_by('-projected_total', 'id')
+        )
+        data = {'budgets': [], 'categories': []}
+        for forecast in SpendingForecastSerializer(forecasts, many=True).data:
+            data['budgets' if forecast['budget'] else 'categories'].append(forecast)
+        return Response(data)
+
+
+class LedgerImportView(APIView):
+    """
+    Bulk import of incomes and expenses from a CSV or JSON-lines upload.
+
+    Send the file as multipart ``file``. Each row has ``type`` (income or
+    expense, or pass a default ``type`` field), ``amount``, ``description``,
+    ``date`` and either ``source`` or ``category`` by name. The format comes
+    from ``file_format`` or the file extension. Valid rows are imported and
+    invalid ones reported by line number.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
 
-        for item in income_data:
-            item['type'] = 'income'
-        for item in expense_data:
-            item['type'] = 'expense'
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
 
-        combined_data = list(chain(income_data, expense_data))
-        sorted_combined_data = sorted(combined_data, key=lambda x: x['created_at'])
+        file_format = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format == 'json':
+            file_format = 'jsonl'
+        if file_format not in IMPORT_FORMATS:
+            return Response({'file_format': ["Must be 'csv' or 'jsonl'."]}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(sorted_combined_data)
+        default_type = request.data.get('type')
+        if default_type and default_type not in ('income', 'expense'):
+            return Response({'type': ["Must be 'income' or 'expense'."]}, status=status.HTTP_400_BAD_REQUEST)
 
+        importer = LedgerImporter(request.user, default_type=default_type)
+        try:
+            result = importer.run(iter_rows(upload.file, file_format))
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # Chunks before the bad line are already imported; say how many.
+            message = 'File must be UTF-8 encoded.' if isinstance(exc, UnicodeDecodeError) else f'Malformed CSV: {exc}'
+            return Response({'file': [message], 'created': importer.created}, status=status.HTTP_400_BAD_REQUEST)
+        if result['error_count'] and not any(result['created'].values()):
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
+class LedgerExportView(APIView):
+    """
+    Streams the user's incomes, expenses, goal contributions and group
+    contributions as CSV (default) or JSON lines (``file_format=jsonl``),
+    optionally limited with ``date_from``/``date_to``. Rows are written as
+    they are read, so memory use does not grow with the account history.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({'file_format': ["Must be 'csv' or 'jsonl'."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        dates = date_range_filters(request.query_params)
+        records = ledger_records(request.user, date_from=dates.get('date__gte'), date_to=dates.get('date__lte'))
+
+        if file_format == 'csv':
+            response = StreamingHttpResponse(stream_csv(records), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(stream_jsonl(records), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="ledger.{file_format}"'
+        return response
 
 
-class FinancialGoalView(viewsets.ModelViewSet):
+class FinancialGoalView(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = FinancialGoals.objects.all()
     serializer_class = FinancialGoalSerializer
     permission_classes = [IsAuthenticated]
+    cache_scope = 'goals'
 
     def get_queryset(self):
-        return FinancialGoals.objects.filter(user=self.request.user)
+        return FinancialGoals.objects.filter(user=self.request.user).prefetch_related('contributions').order_by('target_date', 'id')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @transaction.atomic
     def perform_update(self, serializer):
         # Get the updated goal instance
         goal = serializer.save(user=self.request.user)
@@ -192,13 +506,8 @@ class FinancialGoalView(viewsets.ModelViewSet):
         # Create and save the expense
         expense = Expense.objects.create(**expense_data)
 
-        # Optionally update the user's budget if necessary
-        try:
-            budget = Budget.objects.get(user=self.request.user)
-            budget.total_expenses += Decimal(contribution_amount)
-            budget.save()
-        except Budget.DoesNotExist:
-            pass  # Handle the case where the budget doesn't exist
+        # Update the user's budget, if they have one
+        adjust_budget_totals(self.request.user, expenses=Decimal(contribution_amount))
 
         # Return the updated financial goal data
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -213,38 +522,35 @@ class ManualContributionView(APIView):
             goal_id = serializer.validated_data['goal_id']
             amount = serializer.validated_data['amount']
 
-            try:
-                goal = FinancialGoals.objects.get(id=goal_id, user=request.user)
-            except FinancialGoals.DoesNotExist:
-                return Response({'error': 'Financial goal not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-            # Update the financial goal's current amount
-            goal.current_amount += amount
-            goal.save()
-
-            # Create a contribution record
-            FinancialGoalContribution.objects.create(goal=goal, user=request.user, amount=amount)
-
-            # Create an expense record for the contribution
-            expense_data = {
-                "user": request.user,
-                "amount": amount,
-                "date": localdate(),  # Use today's date
-                "category": goal.category,  # Assuming the goal has a related category
-                "description": f"Contribution to Goal: {goal.name}",
-            }
-
-            # Create and save the expense
-            Expense.objects.create(**expense_data)
-
-            # Optionally update the user's budget if necessary
-            try:
-                budget = Budget.objects.get(user=request.user)
-                if expense_data["date"] == localdate():
-                    budget.total_expenses += Decimal(amount)
-                    budget.save()
-            except Budget.DoesNotExist:
-                pass  # If no budget exists, do nothing
+            with transaction.atomic():
+                # Increment the goal in the database so parallel contributions all count
+                updated = FinancialGoals.objects.filter(id=goal_id, user=request.user).update(
+                    current_amount=F('current_amount') + amount, updated_at=timezone.now()
+                )
+                if not updated:
+                    return Response({'error': 'Financial goal not found.'}, status=status.HTTP_404_NOT_FOUND)
+                goal = FinancialGoals.objects.get(id=goal_id)
+
+                # Create a contribution record
+                FinancialGoalContribution.objects.create(goal=goal, user=request.user, amount=amount)
+
+                # Goals have no category of their own; file contributions under "Goals"
+                category, created = Category.objects.get_or_create(name="Goals", user=request.user)
+
+                # Create an expense record for the contribution
+                expense_data = {
+                    "user": request.user,
+                    "amount": amount,
+                    "date": localdate(),  # Use today's date
+                    "category": category,
+                    "description": f"Contribution to Goal: {goal.name}",
+                }
+
+                # Create and save the expense
+                Expense.objects.create(**expense_data)
+
+                # The contribution is dated today, so it counts towards the budget
+                adjust_budget_totals(request.user, expenses=amount)
 
             return Response({'success': True, 'current_amount': goal.current_amount}, status=status.HTTP_200_OK)
 
@@ -257,13 +563,37 @@ class GroupViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Group.objects.filter(members__user=self.request.user).distinct()
+        # Members, expenses and contributions are fetched with one query each,
+        # however many groups, members or expenses are being rendered.
+        member_groups = GroupMember.objects.filter(user=self.request.user).values('group_id')
+        if self.action == 'settlement':
+            return Group.objects.filter(id__in=member_groups)
+        expenses = GroupExpense.objects.prefetch_related('contributions')
+        return (
+            Group.objects.filter(id__in=member_groups)
+            .select_related('admin')
+            .order_by('name', 'id')
+            .prefetch_related(
+                Prefetch('members', queryset=GroupMember.objects.select_related('user')),
+                Prefetch('expenses', queryset=expenses),
+            )
+        )
 
     def perform_create(self, serializer):
         group = serializer.save()
         GroupChat.objects.create(group=group)
 
 
+    @action(detail=True, methods=['GET'])
+    def settlement(self, request, pk=None):
+        """
+        Every member's net balance and the fewest transfers that settle the
+        group, cached until its expenses, contributions or members change.
+        """
+        group = self.get_object()
+        settlement = get_or_compute('settlement', group.pk, 'settlement', lambda: settle_group(group))
+        return Response(GroupSettlementSerializer(settlement).data)
+
     @action(detail=True, methods=['POST'], url_path='add-member')
     def add_member(self, request, pk=None):
         group = self.get_object()
@@ -292,22 +622,37 @@ class GroupViewSet(viewsets.ModelViewSet):
 
 
 class GroupExpenseViewSet(viewsets.ModelViewSet):
+    """
+    Expenses of the groups the user belongs to, newest first and cursor
+    paginated. ``group`` and ``date_from``/``date_to`` narrow the list.
+    """
     serializer_class = GroupExpenseSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = GroupExpensePagination
 
     def get_queryset(self):
-        return GroupExpense.objects.all()
+        member_groups = GroupMember.objects.filter(user=self.request.user).values('group_id')
+        expenses = GroupExpense.objects.filter(
+            group_id__in=member_groups, **date_range_filters(self.request.query_params, 'date__date')
+        )
+        group_id = self.request.query_params.get('group')
+        if group_id:
+            if not group_id.isdecimal():
+                raise serializers.ValidationError({'group': 'Must be a group id.'})
+            expenses = expenses.filter(group_id=group_id)
+        if self.action == 'batch_contributions':
+            return expenses
+        return expenses.prefetch_related('contributions').order_by('-date', '-id')
 
     def perform_create(self, serializer):
-        print(self.request.data)
         group_id = self.request.data.get('group')
     
         if group_id:
-            try:
-                group = Group.objects.get(pk=group_id)
-                serializer.save(group=group, user=self.request.user)
-            except Group.DoesNotExist:
+            # Only members can add expenses; other groups look like missing ones.
+            group = Group.objects.filter(pk=group_id, members__user=self.request.user).first()
+            if group is None:
                 raise serializers.ValidationError({"error": "Group not found."})
+            serializer.save(group=group, user=self.request.user)
         else:
             raise serializers.ValidationError({"error": "Group ID is required."})
 
@@ -320,30 +665,92 @@ class GroupExpenseViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['post'], url_path='batch-contributions')
+    def batch_contributions(self, request, pk=None):
+        """
+        Adds many contributions to one expense in a single transaction; see
+        ``BatchContributionSerializer`` for the accepted shapes.
+        """
+        group_expense = self.get_object()
+        serializer = BatchContributionSerializer(data=request.data, context={'request': request, 'group_expense': group_expense})
+        serializer.is_valid(raise_exception=True)
+        contributions = serializer.save()
+        return Response(BatchContributionResultSerializer({
+            'contributions': contributions,
+            'contributed_total': group_expense.contributed_total,
+            'contributor_count': group_expense.contributor_count,
+        }).data, status=status.HTTP_201_CREATED)
+
 
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from api.models import GroupChat, GroupChatMessage
 from api.views.main.serializer import GroupChatSerializer, GroupChatMessageSerializer
+from api.consumers import broadcast_chat_message
 from django.shortcuts import get_object_or_404
 
 class GroupChatView(APIView):
     permission_classes = [IsAuthenticated]
+    page_size = 50
+    max_page_size = 200
 
     def get(self, request, group_id):
-        # Get the group chat by group ID
-        group_chat = get_object_or_404(GroupChat, group_id=group_id)
+        """
+        Chat history paged by message id, oldest message first within a page.
 
-        # Retrieve all messages in the group chat
-        messages = GroupChatMessage.objects.filter(group_chat=group_chat).order_by('created_at')
-        serializer = GroupChatMessageSerializer(messages, many=True)
+        With no cursor the latest page is returned. ``before=<id>`` pages back
+        through older messages, ``after=<id>`` (or ``since=<id>`` when polling)
+        returns only messages newer than the given id.
+        """
+        group_chat = get_object_or_404(GroupChat, group_id=group_id)
 
-        for i in range(len(serializer.data)):
-            serializer.data[i]['username'] = User.objects.get(pk = serializer.data[i]['user']).username
+        if not GroupMember.objects.filter(group_id=group_id, user=request.user).exists():
+            return Response({"detail": "User is not a member of the group."}, status=status.HTTP_403_FORBIDDEN)
 
+        before = self.get_message_id(request, 'before')
+        after = self.get_message_id(request, 'after')
+        if after is None:
+            after = self.get_message_id(request, 'since')
+        page_size = self.get_page_size(request)
+
+        # Usernames are joined in the same query as the messages.
+        messages = GroupChatMessage.objects.filter(group_chat=group_chat).select_related('user')
+        if before is not None:
+            messages = messages.filter(id__lt=before)
+
+        if after is not None:
+            page = list(messages.filter(id__gt=after).order_by('id')[:page_size + 1])
+            has_more = len(page) > page_size
+            page = page[:page_size]
+        else:
+            page = list(messages.order_by('-id')[:page_size + 1])
+            has_more = len(page) > page_size
+            page = page[:page_size][::-1]
+
+        serializer = GroupChatMessageSerializer(page, many=True)
+        return Response({
+            'results': serializer.data,
+            'has_more': has_more,
+            'before': page[0].id if page else before,
+            'after': page[-1].id if page else after,
+        }, status=status.HTTP_200_OK)
+
+    def get_message_id(self, request, param):
+        value = request.query_params.get(param)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise serializers.ValidationError({param: 'A valid message id is required.'})
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get('limit', self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
 
     def post(self, request, group_id):
         # Verify the group chat exists
@@ -358,28 +765,20 @@ class GroupChatView(APIView):
         serializer = GroupChatMessageSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(group_chat=group_chat, user=request.user)
+            # Push the message to members connected over WebSocket.
+            broadcast_chat_message(group_chat.id, dict(serializer.data))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = BudgetSerializer
+    cache_scope = 'budgets'
 
     def get_queryset(self):
-        # Get the current date
-        today = localdate()
-        user = self.request.user
-
-        # Get the latest budget for the user
-        last_budget = Budget.objects.filter(user=user).last()
-
-        # If the last reset date is not today's date, reset the budget
-        if last_budget and last_budget.last_reset_date != today:
-            self.reset_budget_for_new_day(user, today)
-
-        # Return the budgets for the user
-        return Budget.objects.filter(user=self.request.user)
+        # Totals are reset by the scheduled reset_budgets task, so reads never write
+        return Budget.objects.filter(user=self.request.user).order_by('id')
 
     def perform_create(self, serializer):
         # Get the current date
@@ -389,31 +788,9 @@ class BudgetViewSet(viewsets.ModelViewSet):
         # Save the new budget with today's reset date
         serializer.save(user=user, last_reset_date=today)
 
-    def reset_budget_for_new_day(self, user, today):
-        # This method resets the budget for the user if the day has changed
-        # Get all the budgets for the user where last_reset_date is not today
-        budgets = Budget.objects.filter(user=user, last_reset_date__lt=today)
-
-        for budget in budgets:
-            # Reset the budget's income and expenses
-            self.reset_budget(budget)
-            # Update the reset date to today
-            budget.last_reset_date = today
-            budget.save()
-
-    def reset_budget(self, budget):
-        # Custom logic to reset the budget (e.g., reset income and expenses)
-        budget.total_income = 0
-        budget.total_expenses = 0
-        budget.save()
-
-
-
-from datetime import datetime
-
 
 class BillReminderViewSet(viewsets.ModelViewSet):
-    queryset = BillReminder.objects.all()
+    queryset = BillReminder.objects.order_by('due_date', 'id')
     serializer_class = BillReminderSerializer
 
     def perform_create(self, serializer):
@@ -1,7 +1,9 @@
 from rest_framework import serializers
-from ...models import GroupChat, GroupChatMessage, IncomeSource, Income, Category, Expense, FinancialGoals, Group, GroupExpense, GroupFinancialGoal, GroupMember, GroupExpenseContribution, FinancialGoalContribution, Budget, BillReminder
+from ...models import GroupChat, GroupChatMessage, IncomeSource, Income, Category, Expense, FinancialGoals, Group, GroupExpense, GroupFinancialGoal, GroupMember, GroupExpenseContribution, FinancialGoalContribution, Budget, BillReminder, SpendingForecast
 from datetime import date
+from decimal import Decimal
 from django.contrib.auth.models import User
+from ...groups import add_contributions, split_amount
 
 class IncomeSourceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -55,6 +57,22 @@ class ExpenseSerializer(serializers.ModelSerializer):
         return representation
 
 
+class IncomeImportSerializer(IncomeSerializer):
+    """
+    Validates an imported income row. The source is given by name and
+    resolved (or created) by the importer.
+    """
+    source = serializers.CharField(max_length=100)
+
+
+class ExpenseImportSerializer(ExpenseSerializer):
+    """
+    Validates an imported expense row. The category is given by name and
+    resolved (or created) by the importer.
+    """
+    category = serializers.CharField(max_length=255)
+
+
 class TransactionSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     type = serializers.CharField()  
@@ -139,8 +157,8 @@ class GroupExpenseSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = GroupExpense
-        fields = ['id', 'group', 'user', 'title', 'amount', 'description', 'date', 'contributions']
-        read_only_fields = ['user']
+        fields = ['id', 'group', 'user', 'title', 'amount', 'description', 'date', 'contributions', 'contributed_total', 'contributor_count']
+        read_only_fields = ['user', 'contributed_total', 'contributor_count']
 
     def get_contributions(self, obj):
         contributions = obj.contributions.all()
@@ -148,8 +166,8 @@ class GroupExpenseSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        # Example: Add a custom field for total contributions
-        representation['total_contributions'] = sum(contrib.amount for contrib in instance.contributions.all())
+        # Kept for older clients; the running total is stored on the expense.
+        representation['total_contributions'] = instance.contributed_total
         return representation
 
 
@@ -209,18 +227,86 @@ class GroupExpenseContributionSerializer(serializers.ModelSerializer):
         group_id = validated_data.pop('group_id')
 
         # Fetch the GroupExpense instance
-        group_expense = GroupExpense.objects.get(id=expense_id, group_id=group_id)
-
-        # Create the contribution
-        contribution = GroupExpenseContribution.objects.create(
-            group_expense=group_expense,
-            user=self.context['request'].user,
-            **validated_data
-        )
+        group_expense = GroupExpense.objects.filter(
+            id=expense_id, group_id=group_id, group__members__user=self.context['request'].user
+        ).first()
+        if group_expense is None:
+            raise serializers.ValidationError({'expense_id': 'Group expense not found.'})
+
+        # Create the contribution and add it to the expense's running totals
+        contribution = GroupExpenseContribution(user=self.context['request'].user, **validated_data)
+        add_contributions(group_expense, [contribution])
         return contribution
 
 
 
+class ContributionItemSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+
+
+class PercentageShareSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    percent = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=Decimal('0.01'), max_value=Decimal('100'))
+
+
+class BatchContributionSerializer(serializers.Serializer):
+    """
+    Many contributions to the ``group_expense`` in the context, given either
+    as explicit ``contributions`` or as a ``split`` of ``amount`` (default:
+    the expense amount): ``equal`` between ``users`` (default: every member)
+    or ``percentage`` over ``shares`` adding up to 100.
+    """
+    max_contributions = 500
+
+    contributions = ContributionItemSerializer(many=True, required=False, allow_empty=False)
+    split = serializers.ChoiceField(choices=['equal', 'percentage'], required=False)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    users = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    shares = PercentageShareSerializer(many=True, required=False, allow_empty=False)
+
+    def validate(self, attrs):
+        if ('contributions' in attrs) == ('split' in attrs):
+            raise serializers.ValidationError("Send either 'contributions' or a 'split'.")
+
+        group_expense = self.context['group_expense']
+        # One query for the membership of everyone involved.
+        member_ids = set(GroupMember.objects.filter(group_id=group_expense.group_id).values_list('user_id', flat=True))
+        if self.context['request'].user.id not in member_ids:
+            raise serializers.ValidationError("Only group members can add contributions.")
+
+        total = attrs.get('amount', group_expense.amount)
+        if 'contributions' in attrs:
+            items = [(item['user'], item['amount']) for item in attrs['contributions']]
+        elif attrs['split'] == 'equal':
+            user_ids = attrs.get('users') or sorted(member_ids)
+            items = list(zip(user_ids, split_amount(total, [1] * len(user_ids))))
+        else:
+            shares = attrs.get('shares')
+            if not shares:
+                raise serializers.ValidationError({'shares': "Required for a percentage split."})
+            if sum(share['percent'] for share in shares) != 100:
+                raise serializers.ValidationError({'shares': "Percentages must add up to 100."})
+            user_ids = [share['user'] for share in shares]
+            items = list(zip(user_ids, split_amount(total, [int(share['percent'] * 100) for share in shares])))
+
+        if len(items) > self.max_contributions:
+            raise serializers.ValidationError(f"At most {self.max_contributions} contributions per request.")
+        if 'split' in attrs and len({user_id for user_id, _ in items}) != len(items):
+            raise serializers.ValidationError("Each user can appear only once in a split.")
+        outsiders = sorted({user_id for user_id, _ in items} - member_ids)
+        if outsiders:
+            raise serializers.ValidationError({'users': f"Not members of the group: {', '.join(map(str, outsiders))}."})
+
+        attrs['items'] = [(user_id, amount) for user_id, amount in items if amount > 0]
+        return attrs
+
+    def create(self, validated_data):
+        return add_contributions(self.context['group_expense'], [
+            GroupExpenseContribution(user_id=user_id, amount=amount) for user_id, amount in validated_data['items']
+        ])
+
+
 class GroupFinancialGoalSerializer(serializers.ModelSerializer):
     class Meta:
         model = GroupFinancialGoal
@@ -239,10 +325,12 @@ class GroupChatSerializer(serializers.ModelSerializer):
 
 
 class GroupChatMessageSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+
     class Meta:
         model = GroupChatMessage
-        fields = ['id', 'group_chat','user', 'message', 'created_at', 'updated_at']
-        read_only_fields = ['id','group_chat', 'created_at', 'updated_at', 'user']
+        fields = ['id', 'group_chat','user', 'username', 'message', 'created_at', 'updated_at']
+        read_only_fields = ['id','group_chat', 'created_at', 'updated_at', 'user', 'username']
 
 class BudgetSerializer(serializers.ModelSerializer):
     balance = serializers.SerializerMethodField()
@@ -264,8 +352,8 @@ class BudgetSerializer(serializers.ModelSerializer):
 class BillReminderSerializer(serializers.ModelSerializer):
     class Meta:
         model = BillReminder
-        fields = ['id', 'bill_name', 'amount', 'category', 'due_date', 'recurring_interval', 'reminder_time', 'user', 'is_paid', 'payment_date']
-        read_only_fields = ['id', 'user']
+        fields = ['id', 'bill_name', 'amount', 'category', 'due_date', 'recurring_interval', 'reminder_time', 'user', 'is_paid', 'payment_date', 'remind_on', 'reminder_sent_on']
+        read_only_fields = ['id', 'user', 'remind_on', 'reminder_sent_on']
 
     def update(self, instance, validated_data):
         """
@@ -280,17 +368,7 @@ class BillReminderSerializer(serializers.ModelSerializer):
 
             # If it's a recurring bill, create the next bill
             if instance.recurring_interval and instance.recurring_interval != 'one_time':
-                new_due_date = self.get_next_due_date(instance)
-                BillReminder.objects.create(
-                    bill_name=instance.bill_name,
-                    amount=instance.amount,
-                    category=instance.category,
-                    due_date=new_due_date,
-                    recurring_interval=instance.recurring_interval,
-                    reminder_time=instance.reminder_time,
-                    user=instance.user,
-                    is_paid=False  # New bill should not be paid
-                )
+                instance.create_recurring_bill()
 
         return super().update(instance, validated_data)
 
@@ -298,20 +376,108 @@ class BillReminderSerializer(serializers.ModelSerializer):
         """
         Helper method to calculate the next due date based on the recurring interval.
         """
-        from datetime import timedelta
-        import calendar
-
-        due_date = instance.due_date
-
-        if instance.recurring_interval == 'monthly':
-            # Move the date to the same day next month
-            next_month = due_date.replace(month=due_date.month % 12 + 1)
-            return next_month
-        elif instance.recurring_interval == 'weekly':
-            return due_date + timedelta(weeks=1)
-        elif instance.recurring_interval == 'yearly':
-            # Add one year to the due date
-            next_year = due_date.replace(year=due_date.year + 1)
-            return next_year
-        # Add more logic for other intervals if needed
-        return due_date
+        return instance.get_next_due_date()
+
+
+class SpendingForecastSerializer(serializers.ModelSerializer):
+    budget_name = serializers.CharField(source='budget.name', read_only=True, default=None)
+    budget_limit = serializers.DecimalField(source='budget.budget_limit', max_digits=10, decimal_places=2, read_only=True, default=None)
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    is_over_budget = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SpendingForecast
+        fields = ['id', 'budget', 'budget_name', 'budget_limit', 'category', 'category_name', 'period_start', 'period_end',
+                  'spent', 'projected_total', 'daily_rate', 'is_over_budget', 'generated_on']
+        read_only_fields = fields
+
+    def get_is_over_budget(self, obj):
+        if obj.budget is None:
+            return None
+        return obj.projected_total > obj.budget.budget_limit
+
+
+class SpendingPeriodSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    income = serializers.DecimalField(max_digits=15, decimal_places=2)
+    expenses = serializers.DecimalField(max_digits=15, decimal_places=2)
+    net = serializers.DecimalField(max_digits=15, decimal_places=2)
+    income_count = serializers.IntegerField()
+    expense_count = serializers.IntegerField()
+
+
+class SpendingByCategorySerializer(serializers.Serializer):
+    category = serializers.IntegerField()
+    category_name = serializers.CharField()
+    expenses = serializers.DecimalField(max_digits=15, decimal_places=2)
+    expense_count = serializers.IntegerField()
+
+
+class SpendingBySourceSerializer(serializers.Serializer):
+    source = serializers.IntegerField()
+    source_name = serializers.CharField()
+    income = serializers.DecimalField(max_digits=15, decimal_places=2)
+    income_count = serializers.IntegerField()
+
+
+class CategoryTotalSerializer(serializers.Serializer):
+    category = serializers.IntegerField()
+    category_name = serializers.CharField()
+    total = serializers.DecimalField(max_digits=15, decimal_places=2)
+    count = serializers.IntegerField()
+    share = serializers.DecimalField(max_digits=5, decimal_places=4, allow_null=True)
+
+
+class MonthlyTrendSerializer(serializers.Serializer):
+    month = serializers.DateField()
+    income = serializers.DecimalField(max_digits=15, decimal_places=2)
+    expenses = serializers.DecimalField(max_digits=15, decimal_places=2)
+    net = serializers.DecimalField(max_digits=15, decimal_places=2)
+    previous_income = serializers.DecimalField(max_digits=15, decimal_places=2, allow_null=True)
+    previous_expenses = serializers.DecimalField(max_digits=15, decimal_places=2, allow_null=True)
+    # Percentages are unbounded, e.g. after a month with almost no spending.
+    income_change = serializers.DecimalField(max_digits=None, decimal_places=2, allow_null=True)
+    expenses_change = serializers.DecimalField(max_digits=None, decimal_places=2, allow_null=True)
+
+
+class RollingAverageSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    expenses = serializers.DecimalField(max_digits=15, decimal_places=2)
+    avg_7d = serializers.DecimalField(max_digits=15, decimal_places=2)
+    avg_30d = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class MerchantTotalSerializer(serializers.Serializer):
+    description = serializers.CharField()
+    total = serializers.DecimalField(max_digits=15, decimal_places=2)
+    count = serializers.IntegerField()
+    last_date = serializers.DateField()
+
+
+class MemberBalanceSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    username = serializers.CharField()
+    member = serializers.BooleanField()
+    paid = serializers.DecimalField(max_digits=15, decimal_places=2)
+    share = serializers.DecimalField(max_digits=15, decimal_places=2)
+    balance = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class SettlementTransferSerializer(serializers.Serializer):
+    from_user = serializers.IntegerField()
+    from_username = serializers.CharField()
+    to_user = serializers.IntegerField()
+    to_username = serializers.CharField()
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class GroupSettlementSerializer(serializers.Serializer):
+    group = serializers.IntegerField()
+    balances = MemberBalanceSerializer(many=True)
+    transfers = SettlementTransferSerializer(many=True)
+
+
+class BatchContributionResultSerializer(serializers.Serializer):
+    contributions = GroupExpenseContributionSerializer(many=True)
+    contributed_total = serializers.DecimalField(max_digits=10, decimal_places=2)
+    contributor_count = serializers.IntegerField()
@@ -14,10 +14,26 @@ app.autodiscover_tasks()
 
 
 app.conf.beat_schedule = {
+    'reset-budgets-daily': {
+        'task': 'api.tasks.reset_budgets',
+        'schedule': crontab(hour=0, minute=0),
+    },
     'transfer-funds-daily': {
         'task': 'api.tasks.transfer_to_financial_goals',
         'schedule': crontab(hour=0, minute=0), 
     },
+    'generate-recurring-bills-daily': {
+        'task': 'api.tasks.generate_recurring_bills',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    'send-bill-reminders-daily': {
+        'task': 'api.tasks.send_bill_reminders',
+        'schedule': crontab(hour=8, minute=0),
+    },
+    'forecast-spending-nightly': {
+        'task': 'api.tasks.compute_spending_forecasts',
+        'schedule': crontab(hour=1, minute=0),
+    },
 }
 
 
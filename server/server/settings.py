@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -32,6 +33,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    # First, so runserver serves ASGI_APPLICATION (and the WebSocket routes).
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -43,9 +46,11 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'channels',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -56,6 +61,19 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Requests above either budget are logged by api.middleware.RequestMetricsMiddleware.
+REQUEST_QUERY_BUDGET = int(os.environ.get('REQUEST_QUERY_BUDGET', 20))
+REQUEST_TIME_BUDGET_MS = int(os.environ.get('REQUEST_TIME_BUDGET_MS', 500))
+
+# /metrics is off unless enabled. When on, it is served to staff sessions and
+# to scrapers sending "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Delivery of bill reminders; see api/notifications.py for the backends.
+NOTIFICATION_BACKEND = os.environ.get('NOTIFICATION_BACKEND', 'api.notifications.ConsoleNotifier')
+NOTIFICATION_FILE_PATH = os.environ.get('NOTIFICATION_FILE_PATH', BASE_DIR / 'notifications.jsonl')
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173"
 ]
@@ -68,7 +86,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
+    # Every list endpoint is paginated; see api/pagination.py.
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.DefaultPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
 }
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 200))
 
 # Optional: Configure JWT settings
 # Consolidate all JWT settings into a single SIMPLE_JWT dictionary
@@ -102,16 +124,110 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'server.wsgi.application'
 
+ASGI_APPLICATION = 'server.asgi.application'
+
+
+# Channel layer used to fan group chat messages out to WebSocket clients.
+# The in-memory layer only reaches sockets served by the same process; set
+# CHANNEL_LAYER=redis to share messages between nodes through any
+# Redis-compatible server.
+
+if os.environ.get('CHANNEL_LAYER', 'memory') == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [os.environ.get('CHANNEL_REDIS_URL', 'redis://localhost:6379/1')],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+#
+# DB_PROFILE selects the backend:
+#   sqlite   (default) single node; WAL journal, synchronous=NORMAL, busy timeout
+#   postgres server database with a psycopg connection pool (DB_POOL=1, needs
+#            psycopg[pool]) or persistent connections (DB_POOL=0)
+
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DB_POOL = os.environ.get('DB_POOL', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'budget'),
+            'USER': os.environ.get('POSTGRES_USER', 'budget'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Django's pool and persistent connections are mutually exclusive.
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Keep connections (and their PRAGMAs) between requests.
+            'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            # Wait for the write lock instead of failing with "database is locked",
+            # and take it when a transaction starts so concurrent requests queue
+            # up rather than deadlock on upgrade. WAL lets readers work while a
+            # write is in progress; synchronous=NORMAL is safe in WAL mode and
+            # avoids an fsync per commit.
+            'OPTIONS': {
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA busy_timeout=20000',
+            },
+            # A file-backed test database lets concurrency tests use real threads.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default; set REDIS_CACHE_URL to share the cache between
+# processes. API_RESPONSE_CACHE_* configure the per-user response cache in
+# api/cache.py.
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+if os.environ.get('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_CACHE_URL'],
+        },
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+API_RESPONSE_CACHE_ALIAS = 'default'
+API_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('API_RESPONSE_CACHE_TIMEOUT', 300))
 
 
 # Password validation